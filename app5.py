@@ -2,10 +2,11 @@ from dash import Dash, dcc, html, Input, Output, State
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from sqlalchemy import create_engine
 from collections import Counter
 import io
 
+import connessioni_db
+
 app = Dash(__name__)
 
 app.layout = html.Div([
@@ -61,7 +62,7 @@ app.layout = html.Div([
 
 def create_engine_from_params(user, password, host, port, dbname):
     conn_str = f"mysql+pymysql://{user}:{password}@{host}:{port}/{dbname}"
-    return create_engine(conn_str)
+    return connessioni_db.motore(conn_str)
 
 def load_data(engine):
     query = """
@@ -1,10 +1,15 @@
 from dash import Dash, dcc, html, Input, Output, State
 import pandas as pd
+from sqlalchemy import text
 import plotly.graph_objects as go
 import plotly.express as px
-from sqlalchemy import create_engine
-from collections import Counter
-import io
+import os
+
+import cache_dati
+import colonnare
+import connessioni_db
+import db_locale
+import indice_frequenze
 
 app = Dash(__name__)
 
@@ -32,6 +37,17 @@ app.layout = html.Div([
         dcc.Input(id='db-port', type='number', value=3306, min=1, max=65535),
         html.Label("Nome Database:"),
         dcc.Input(id='db-name', type='text', value='lotterie'),
+        html.Label("Sorgente:"),
+        dcc.RadioItems(
+            id='db-backend',
+            options=[
+                {'label': 'MariaDB', 'value': 'mariadb'},
+                {'label': 'SQLite locale', 'value': 'sqlite'},
+                {'label': 'Istantanea Arrow', 'value': 'arrow'},
+            ],
+            value=os.getenv("DB_BACKEND", "mariadb"),
+            inline=True
+        ),
         html.Button("Carica Dati", id='load-data-btn'),
     ], style={'margin-bottom': '18px', 'display': 'flex', 'flexWrap': 'wrap', 'gap': '10px'}),
     html.Div([
@@ -58,69 +74,37 @@ app.layout = html.Div([
         html.Div(dcc.Graph(id='time-num-chart'), style={'width': '100%', 'maxWidth': '700px', 'display': 'inline-block'}),
     ], style={'display': 'flex', 'flexWrap': 'wrap', 'gap': '30px'}),
     html.Div(id='info-panel', style={'marginTop': '30px', 'fontWeight': 'bold', 'fontSize': '18px'}),
-    dcc.Store(id='stored-data')
+    dcc.Store(id='stored-data'),
+    dcc.Store(id='stored-aggregates')
 ], id='main-div')
 
 def create_engine_from_params(user, password, host, port, dbname):
     conn_str = f"mysql+pymysql://{user}:{password}@{host}:{port}/{dbname}"
-    return create_engine(conn_str)
+    return connessioni_db.motore(conn_str)
 
-def load_data(engine):
-    query = """
+def load_data(engine, since=None):
+    # Con since si scaricano solo le estrazioni da quella data in poi (sincronizzazione incrementale)
+    # Parametri con nome di SQLAlchemy: la stessa query vale per MariaDB e per SQLite
+    where = "WHERE data >= :since" if since is not None else ""
+    query = text(f"""
         SELECT data, n1, n2, n3, n4, n5, n6, n7, n8, n9, n10, n11, n12, n13, n14, n15
         FROM estrazioni_reali
+        {where}
         ORDER BY data
-    """
-    try:
-        df = pd.read_sql(query, con=engine)
-        df['data'] = pd.to_datetime(df['data'])
-        return df
-    except Exception as e:
-        print(f"Errore nel caricamento dati: {e}")
-        cols = ['data'] + [f"n{i}" for i in range(1,16)]
-        return pd.DataFrame(columns=cols)
-
-def filter_data_by_date(df, start_date, end_date):
-    if start_date:
-        df = df[df['data'] >= pd.to_datetime(start_date)]
-    if end_date:
-        df = df[df['data'] <= pd.to_datetime(end_date)]
+    """)
+    params = {'since': pd.Timestamp(since).date()} if since is not None else None
+    # Nessun fallback su un DataFrame vuoto: l'errore arriva al callback
+    df = pd.read_sql(query, con=engine, params=params)
+    df['data'] = pd.to_datetime(df['data'])
     return df
 
-def freq_numeri_generate(df):
-    if df.empty:
-        return {}
-    numbers = []
-    for _, row in df.iterrows():
-        numbers.extend(row[1:].tolist())  # esclude 'data'
-    return dict(Counter(numbers))
-
-def freq_combinazioni(df):
-    if df.empty:
-        return Counter()
-    comb_counter = Counter()
-    for _, row in df.iterrows():
-        comb = tuple(sorted(row[1:].tolist()))
-        comb_counter[comb] += 1
-    return comb_counter
-
-def freq_numero_per_data(df, numero):
-    if df.empty:
-        return pd.DataFrame()
-    df['contains_num'] = df.apply(lambda r: numero in r[1:].tolist(), axis=1)
-    df_sorted = df.sort_values('data')
-    df_sorted['freq_cum'] = df_sorted['contains_num'].cumsum()
-    return df_sorted[['data', 'freq_cum']]
-
-def safe_read_json(data_json):
-    if not data_json:
-        return pd.DataFrame()
-    try:
-        df = pd.read_json(io.StringIO(data_json), orient='split')
-        return df
-    except Exception as e:
-        print(f"[DEBUG] Errore parsing JSON: {e}")
-        return pd.DataFrame()
+def table_version(engine):
+    # Versione economica della tabella: cambia quando si aggiunge un'estrazione
+    # Nessun fallback: se la connessione fallisce (es. password errata) l'errore
+    # arriva al callback invece di servire lo storico già in cache
+    query = "SELECT COUNT(*) AS righe, MAX(data) AS ultima FROM estrazioni_reali"
+    versione = pd.read_sql(query, con=engine).iloc[0]
+    return (int(versione['righe']), str(versione['ultima']))
 
 @app.callback(
     Output('stored-data', 'data'),
@@ -131,39 +115,72 @@ def safe_read_json(data_json):
     State('db-host', 'value'),
     State('db-port', 'value'),
     State('db-name', 'value'),
+    State('db-backend', 'value'),
     prevent_initial_call=True
 )
-def load_and_store_data(n_clicks, user, password, host, port, dbname):
+def load_and_store_data(n_clicks, user, password, host, port, dbname, backend):
     try:
-        engine = create_engine_from_params(user, password, host, port, dbname)
-        df = load_data(engine)
+        if backend == 'arrow':
+            # Istantanea colonnare in memory map: nessuna query e nessuna conversione
+            nome_file = colonnare.file_predefinito()
+            istantanea = colonnare.carica_dataframe(nome_file).drop(columns='concorso')
+            connessione = cache_dati.chiave_connessione('arrow', nome_file)
+            carica_tutto = lambda: istantanea
+            carica_nuove = lambda since: istantanea[istantanea['data'] >= since]
+            versione = (len(istantanea), str(istantanea['data'].max()))
+        else:
+            if backend == 'sqlite':
+                engine = connessioni_db.motore(db_locale.url())
+                connessione = cache_dati.chiave_connessione('sqlite', db_locale.FILE_DB)
+            else:
+                engine = create_engine_from_params(user, password, host, port, dbname)
+                connessione = cache_dati.chiave_connessione(user, host, port, dbname)
+            carica_tutto = lambda: load_data(engine)
+            carica_nuove = lambda since: load_data(engine, since)
+            versione = table_version(engine)
+        data_key, df = cache_dati.sincronizza(connessione, carica_tutto, carica_nuove, versione)
         if df.empty:
             print("[DEBUG] DataFrame vuoto dopo caricamento dati.")
             return None, []
-        data_json = df.to_json(date_format='iso', orient='split')
         numeri = sorted({n for col in df.columns[1:] for n in df[col].dropna().unique()})
         options = [{'label': str(n), 'value': int(n)} for n in numeri]
         print("[DEBUG] Dati caricati correttamente.")
-        return data_json, options
+        return data_key, options
     except Exception as e:
         print(f"Errore connessione o caricamento dati: {e}")
         return None, []
 
 @app.callback(
-    Output('freq-num-chart', 'figure'),
+    Output('stored-aggregates', 'data'),
     Input('stored-data', 'data'),
     Input('date-range-picker', 'start_date'),
-    Input('date-range-picker', 'end_date'),
+    Input('date-range-picker', 'end_date')
+)
+def compute_aggregates(data_key, start_date, end_date):
+    # Unico calcolo per (dati, intervallo): i grafici leggono solo il risultato memorizzato
+    if indice_frequenze.aggregati(data_key, start_date, end_date) is None:
+        return None
+    return {'data_key': data_key, 'start_date': start_date, 'end_date': end_date}
+
+def get_aggregates(aggregates_ref):
+    if not aggregates_ref:
+        return None
+    return indice_frequenze.aggregati(
+        aggregates_ref['data_key'], aggregates_ref['start_date'], aggregates_ref['end_date']
+    )
+
+@app.callback(
+    Output('freq-num-chart', 'figure'),
+    Input('stored-aggregates', 'data'),
     Input('dark-theme-toggle', 'value')
 )
-def update_freq_num_chart(data_json, start_date, end_date, dark_theme):
-    df = safe_read_json(data_json)
-    if df.empty:
+def update_freq_num_chart(aggregates_ref, dark_theme):
+    aggregati = get_aggregates(aggregates_ref)
+    if aggregati is None:
         return go.Figure(layout={"annotations": [{"text": "Carica i dati per visualizzare il grafico", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
-    df = filter_data_by_date(df, start_date, end_date)
-    if df.empty:
+    if aggregati.vuoto():
         return go.Figure(layout={"annotations": [{"text": "Nessun dato nell'intervallo selezionato", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
-    freq = freq_numeri_generate(df)
+    freq = aggregati.frequenze
     if not freq:
         return go.Figure(layout={"annotations": [{"text": "Nessuna frequenza calcolata", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
     sorted_nums = sorted(freq.items(), key=lambda x: x[1], reverse=True)
@@ -191,20 +208,16 @@ def update_freq_num_chart(data_json, start_date, end_date, dark_theme):
 
 @app.callback(
     Output('top-comb-chart', 'figure'),
-    Input('stored-data', 'data'),
-    Input('date-range-picker', 'start_date'),
-    Input('date-range-picker', 'end_date'),
+    Input('stored-aggregates', 'data'),
     Input('dark-theme-toggle', 'value')
 )
-def update_top_comb_chart(data_json, start_date, end_date, dark_theme):
-    df = safe_read_json(data_json)
-    if df.empty:
+def update_top_comb_chart(aggregates_ref, dark_theme):
+    aggregati = get_aggregates(aggregates_ref)
+    if aggregati is None:
         return go.Figure(layout={"annotations": [{"text": "Carica i dati per visualizzare il grafico", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
-    df = filter_data_by_date(df, start_date, end_date)
-    if df.empty:
+    if aggregati.vuoto():
         return go.Figure(layout={"annotations": [{"text": "Nessun dato nell'intervallo selezionato", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
-    comb_freq = freq_combinazioni(df)
-    top_comb = comb_freq.most_common(5)
+    top_comb = aggregati.top_combinazioni
     if not top_comb:
         return go.Figure(layout={"annotations": [{"text": "Nessuna combinazione trovata", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
     comb_labels = [", ".join(map(str, comb)) for comb, _ in top_comb]
@@ -233,19 +246,16 @@ def update_top_comb_chart(data_json, start_date, end_date, dark_theme):
 
 @app.callback(
     Output('dist-freq-chart', 'figure'),
-    Input('stored-data', 'data'),
-    Input('date-range-picker', 'start_date'),
-    Input('date-range-picker', 'end_date'),
+    Input('stored-aggregates', 'data'),
     Input('dark-theme-toggle', 'value')
 )
-def update_dist_freq_chart(data_json, start_date, end_date, dark_theme):
-    df = safe_read_json(data_json)
-    if df.empty:
+def update_dist_freq_chart(aggregates_ref, dark_theme):
+    aggregati = get_aggregates(aggregates_ref)
+    if aggregati is None:
         return go.Figure(layout={"annotations": [{"text": "Carica i dati per visualizzare il grafico", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
-    df = filter_data_by_date(df, start_date, end_date)
-    if df.empty:
+    if aggregati.vuoto():
         return go.Figure(layout={"annotations": [{"text": "Nessun dato nell'intervallo selezionato", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
-    freq = freq_numeri_generate(df)
+    freq = aggregati.frequenze
     counts = list(freq.values())
     if not counts:
         return go.Figure(layout={"annotations": [{"text": "Nessuna frequenza trovata", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]})
@@ -291,26 +301,22 @@ def update_dist_freq_chart(data_json, start_date, end_date, dark_theme):
 @app.callback(
     Output('time-num-chart', 'figure'),
     Output('info-panel', 'children'),
-    Input('stored-data', 'data'),
+    Input('stored-aggregates', 'data'),
     Input('numeri-temporali', 'value'),
-    Input('date-range-picker', 'start_date'),
-    Input('date-range-picker', 'end_date'),
     Input('dark-theme-toggle', 'value')
 )
-def update_time_num_chart(data_json, numeri, start_date, end_date, dark_theme):
-    df = safe_read_json(data_json)
-    if df.empty or not numeri:
+def update_time_num_chart(aggregates_ref, numeri, dark_theme):
+    aggregati = get_aggregates(aggregates_ref)
+    if aggregati is None or not numeri:
         return go.Figure(layout={"annotations": [{"text": "Carica i dati e seleziona almeno un numero", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]}), ""
-    df = filter_data_by_date(df, start_date, end_date)
-    if df.empty:
+    if aggregati.vuoto():
         return go.Figure(layout={"annotations": [{"text": "Nessun dato nell'intervallo selezionato", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 18}}]}), ""
     fig = go.Figure()
     info = []
     for numero in numeri:
-        df_freq = freq_numero_per_data(df, numero)
+        df_freq = aggregati.cumulata_numero(numero)
         if df_freq.empty:
             continue
-        df_freq['data'] = pd.to_datetime(df_freq['data'])
         fig.add_trace(go.Scatter(
             x=df_freq['data'],
             y=df_freq['freq_cum'],
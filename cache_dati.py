@@ -0,0 +1,152 @@
+"""
+Cache lato server delle tabelle caricate dalla dashboard.
+
+Invece di serializzare tutto lo storico in JSON dentro dcc.Store (e rispedirlo
+al server a ogni callback), la dashboard salva il DataFrame qui e nello Store
+tiene solo una chiave di pochi byte. La chiave deriva dai parametri di
+connessione e da una versione della tabella (numero di righe e ultima data),
+quindi un nuovo caricamento riusa i dati se la tabella non è cambiata.
+
+Per ogni connessione si ricorda anche l'ultima versione in cache: quando la
+tabella cresce, sincronizza() scarica solo le righe dall'ultima data già
+presente in poi e le sostituisce a quelle di quella data, invece di rileggere
+tutta la tabella. Rileggere l'ultima data evita di perdere un'estrazione con
+la stessa data di una già in cache.
+
+I DataFrame sono scritti su disco (pickle, scrittura atomica) così che tutti i
+worker gunicorn li vedano, e tenuti in memoria in ogni processo dopo la prima
+lettura.
+"""
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+import pandas as pd
+
+CARTELLA_CACHE = './dat/cache_dash'
+MAX_IN_MEMORIA = 4
+
+_memoria = OrderedDict()
+
+
+def chiave_connessione(*parametri):
+    """Identifica la sorgente dati (parametri di connessione, senza password)."""
+    return hashlib.sha1(repr(tuple(str(p) for p in parametri)).encode()).hexdigest()
+
+
+def chiave(connessione, versione):
+    """Chiave della tabella: connessione e versione dei dati."""
+    return hashlib.sha1(repr((connessione, versione)).encode()).hexdigest()
+
+
+def _percorso(chiave_dati):
+    return os.path.join(CARTELLA_CACHE, chiave_dati + '.pkl')
+
+
+def _ricorda(chiave_dati, df):
+    _memoria[chiave_dati] = df
+    _memoria.move_to_end(chiave_dati)
+    while len(_memoria) > MAX_IN_MEMORIA:
+        _memoria.popitem(last=False)
+
+
+def salva_dataframe(chiave_dati, df):
+    """Salva il DataFrame in memoria e su disco (file temporaneo + rename)."""
+    _ricorda(chiave_dati, df)
+    percorso = _percorso(chiave_dati)
+    temporaneo = f"{percorso}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CARTELLA_CACHE, exist_ok=True)
+        df.to_pickle(temporaneo)
+        os.replace(temporaneo, percorso)
+    except OSError as e:
+        print(f"Impossibile salvare la cache '{percorso}': {e}")
+
+
+def leggi_dataframe(chiave_dati):
+    """Restituisce il DataFrame associato alla chiave, o None se non è in cache."""
+    # La chiave arriva dal browser: solo hash esadecimali, mai percorsi arbitrari
+    if not isinstance(chiave_dati, str) or not re.fullmatch(r'[0-9a-f]{40}', chiave_dati):
+        return None
+    if chiave_dati in _memoria:
+        _memoria.move_to_end(chiave_dati)
+        return _memoria[chiave_dati]
+    try:
+        df = pd.read_pickle(_percorso(chiave_dati))
+    except (OSError, ValueError, EOFError):
+        return None
+    _ricorda(chiave_dati, df)
+    return df
+
+
+def _percorso_ultima(connessione):
+    return os.path.join(CARTELLA_CACHE, connessione + '.ultima')
+
+
+def ultima_chiave(connessione):
+    """Chiave dell'ultima versione in cache per la connessione, o None."""
+    try:
+        with open(_percorso_ultima(connessione), 'r', encoding='ascii') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _registra_ultima(connessione, chiave_dati):
+    percorso = _percorso_ultima(connessione)
+    temporaneo = f"{percorso}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CARTELLA_CACHE, exist_ok=True)
+        with open(temporaneo, 'w', encoding='ascii') as f:
+            f.write(chiave_dati)
+        os.replace(temporaneo, percorso)
+    except OSError as e:
+        print(f"Impossibile salvare la cache '{percorso}': {e}")
+
+
+def sincronizza(connessione, carica_tutto, carica_nuove, versione=None):
+    """
+    Allinea la cache alla tabella e restituisce (chiave, DataFrame).
+
+    carica_tutto() legge l'intera tabella, carica_nuove(ultima_data) solo le
+    righe con data uguale o successiva. versione è (righe, ultima data): con
+    una versione già in cache non si interroga la tabella, e se dopo l'accodamento
+    il numero di righe non coincide (righe modificate o cancellate) si ricarica
+    tutto. Senza versione ci si fida del solo aggiornamento incrementale: per
+    una sorgente remota la versione va letta prima (e un suo errore propagato),
+    altrimenti una connessione fallita restituirebbe i dati in cache.
+    """
+    if versione is not None:
+        chiave_dati = chiave(connessione, versione)
+        df = leggi_dataframe(chiave_dati)
+        if df is not None:
+            _registra_ultima(connessione, chiave_dati)
+            return chiave_dati, df
+
+    chiave_precedente = ultima_chiave(connessione)
+    precedente = leggi_dataframe(chiave_precedente)
+    df = None
+    if precedente is not None and not precedente.empty:
+        ultima = precedente['data'].max()
+        nuove = carica_nuove(ultima)
+        # Le righe dell'ultima data in cache vengono sostituite da quelle appena lette
+        gia_presenti = precedente['data'] == ultima
+        if versione is None and len(nuove) == gia_presenti.sum() and (nuove['data'] == ultima).all():
+            return chiave_precedente, precedente
+        df = pd.concat([precedente[~gia_presenti], nuove], ignore_index=True)
+        if versione is not None and len(df) != versione[0]:
+            print("[DEBUG] Tabella modificata oltre l'ultima data in cache: ricarico tutto.")
+            df = None
+
+    if df is None:
+        df = carica_tutto()
+        if df.empty:
+            return None, df
+    if versione is None:
+        versione = (len(df), str(df['data'].max()))
+
+    chiave_dati = chiave(connessione, versione)
+    salva_dataframe(chiave_dati, df)
+    _registra_ultima(connessione, chiave_dati)
+    return chiave_dati, df
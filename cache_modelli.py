@@ -0,0 +1,154 @@
+"""
+Cache dei risultati dei modelli (combinatorio, bayesiano, Monte Carlo, ...).
+
+Un modello decorato con @memorizza viene calcolato una sola volta per
+combinazione di (impronta dello storico, modello, parametri): le chiamate
+successive nello stesso processo (es. modello_ensemble dopo le stampe dei
+singoli metodi) riusano il risultato in memoria, le esecuzioni successive lo
+rileggono da disco. L'impronta è un hash del contenuto delle estrazioni, quindi
+quando dati.txt cambia le voci vecchie non vengono più trovate; anche il
+sorgente del modello fa parte della chiave, così una modifica al codice non
+restituisce risultati calcolati con la versione precedente.
+
+Ogni file porta nel nome il modello (script e funzione) e la coppia
+impronta/sorgente: quando un modello salva una voce, le sue voci con
+un'impronta o un sorgente diversi vengono cancellate, così la cartella non
+cresce a ogni nuova estrazione. I risultati che dipendono da un seme non
+impostato (simulazioni casuali) restano solo in memoria.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+
+import numpy as np
+
+CARTELLA_CACHE = './dat/cache_modelli'
+
+_memoria = {}
+
+
+def impronta(estrazioni):
+    """
+    Hash SHA-1 del contenuto delle estrazioni (array NumPy o sequenza di sequenze).
+    Un oggetto con un proprio metodo impronta() (es. statistiche.Statistiche) lo usa.
+    """
+    if hasattr(estrazioni, 'impronta'):
+        return estrazioni.impronta()
+    h = hashlib.sha1()
+    if isinstance(estrazioni, np.ndarray):
+        h.update(str((estrazioni.dtype.str, estrazioni.shape)).encode())
+        h.update(np.ascontiguousarray(estrazioni).tobytes())
+    else:
+        h.update(repr([tuple(e) for e in estrazioni]).encode())
+    return h.hexdigest()
+
+
+def _sorgente(funzione):
+    try:
+        codice = inspect.getsource(funzione)
+    except (OSError, TypeError):
+        codice = funzione.__qualname__
+    return hashlib.sha1(codice.encode()).hexdigest()
+
+
+def _modello(funzione):
+    """Identità del modello: file sorgente e nome della funzione."""
+    origine = f"{os.path.realpath(funzione.__code__.co_filename)}:{funzione.__qualname__}"
+    return hashlib.sha1(origine.encode()).hexdigest()[:16]
+
+
+def _percorso(nome):
+    return os.path.join(CARTELLA_CACHE, nome + '.pkl')
+
+
+def _leggi(nome):
+    try:
+        with open(_percorso(nome), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+def _scrivi(nome, risultato):
+    """Scrive la voce in modo atomico (file temporaneo + rename)."""
+    percorso = _percorso(nome)
+    temporaneo = percorso + '.tmp'
+    try:
+        os.makedirs(CARTELLA_CACHE, exist_ok=True)
+        with open(temporaneo, 'wb') as f:
+            pickle.dump(risultato, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaneo, percorso)
+    except OSError as e:
+        print(f"Impossibile salvare la cache '{percorso}': {e}")
+
+
+def _pota(modello, gruppo):
+    """Cancella le voci del modello calcolate su un altro storico o con un altro sorgente."""
+    try:
+        nomi = os.listdir(CARTELLA_CACHE)
+    except OSError:
+        return
+    for nome in nomi:
+        if nome.startswith(modello + '-') and not nome.startswith(gruppo + '-'):
+            try:
+                os.remove(os.path.join(CARTELLA_CACHE, nome))
+            except OSError:
+                pass
+
+
+def memorizza(funzione=None, *, dipende_da=None):
+    """
+    Decoratore per le funzioni modello(estrazioni, *parametri).
+    dipende_da è una funzione senza argomenti il cui valore entra nella chiave
+    (es. montecarlo.seme per i modelli che dipendono dal seme configurato): se
+    restituisce None il risultato non è riproducibile e non va su disco.
+    """
+    def decora(f):
+        codice = _sorgente(f)
+        identita = _modello(f)
+
+        @functools.wraps(f)
+        def modello(estrazioni, *args, **kwargs):
+            dipendenza = dipende_da() if dipende_da is not None else None
+            impronta_dati = impronta(estrazioni)
+            parti = (
+                f.__name__,
+                codice,
+                impronta_dati,
+                args,
+                sorted(kwargs.items()),
+                dipendenza,
+            )
+            chiave = hashlib.sha1(repr(parti).encode()).hexdigest()
+            if chiave in _memoria:
+                return _memoria[chiave]
+
+            su_disco = dipende_da is None or dipendenza is not None
+            gruppo = f"{identita}-{hashlib.sha1((codice + impronta_dati).encode()).hexdigest()[:16]}"
+            nome = f"{gruppo}-{chiave}"
+            risultato = _leggi(nome) if su_disco else None
+            if risultato is None:
+                risultato = f(estrazioni, *args, **kwargs)
+                if su_disco:
+                    _scrivi(nome, risultato)
+                    _pota(identita, gruppo)
+            _memoria[chiave] = risultato
+            return risultato
+
+        return modello
+
+    if funzione is not None:
+        return decora(funzione)
+    return decora
+
+
+def svuota(disco=False):
+    """Svuota la cache in memoria e, se richiesto, le voci salvate su disco."""
+    _memoria.clear()
+    if not disco or not os.path.isdir(CARTELLA_CACHE):
+        return
+    for nome in os.listdir(CARTELLA_CACHE):
+        if nome.endswith('.pkl'):
+            os.remove(os.path.join(CARTELLA_CACHE, nome))
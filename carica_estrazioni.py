@@ -1,55 +1,115 @@
-import mysql.connector
-from mysql.connector import errorcode
 import datetime
+import itertools
+import os
+import sqlite3
 
-def leggi_file(nome_file):
-    estrazioni = []
-    with open(nome_file, 'r', encoding='utf-8') as f:
-        for linea in f:
-            dati = linea.strip().split()
-            if len(dati) != 17:
-                print(f"⚠️ Riga ignorata (formato non valido): {linea.strip()}")
+import db_locale
+
+BATCH_DEFAULT = 500
+
+INSERT_ESTRAZIONE = """
+    INSERT IGNORE INTO estrazioni_reali
+    (data, n1, n2, n3, n4, n5, n6, n7, n8, n9, n10, n11, n12, n13, n14, n15)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def leggi_estrazioni(righe):
+    """Restituisce (concorso, data, numeri) per ogni riga valida nel formato di dati.txt."""
+    for linea in righe:
+        dati = linea.strip().split()
+        if len(dati) != 17:
+            print(f"⚠️ Riga ignorata (formato non valido): {linea.strip()}")
+            continue
+        try:
+            concorso = int(dati[0])
+            data_str = dati[1]
+            data = datetime.datetime.strptime(data_str, '%d/%m/%Y').date()
+            numeri = list(map(int, dati[2:]))
+            if len(numeri) != 15:
+                print(f"⚠️ Riga ignorata (numeri non validi): {linea.strip()}")
                 continue
-            try:
-                # dati[0] = numero concorso (ignoriamo)
-                data_str = dati[1]
-                data = datetime.datetime.strptime(data_str, '%d/%m/%Y').date()
-                numeri = list(map(int, dati[2:]))
-                if len(numeri) != 15:
-                    print(f"⚠️ Riga ignorata (numeri non validi): {linea.strip()}")
-                    continue
-                estrazioni.append((data, numeri))
-            except Exception as e:
-                print(f"⚠️ Riga ignorata (errore parsing): {linea.strip()} - {e}")
-    return estrazioni
-
-def carica_estrazioni(conn, estrazioni):
-    inserite = 0
-    ignorate = 0
-    errori = 0
-    cursor = conn.cursor()
+            yield concorso, data, numeri
+        except Exception as e:
+            print(f"⚠️ Riga ignorata (errore parsing): {linea.strip()} - {e}")
 
-    for data, numeri in estrazioni:
+def leggi_righe(righe):
+    """Restituisce (data, numeri) per ogni riga valida: la tabella MariaDB non ha il concorso."""
+    for _, data, numeri in leggi_estrazioni(righe):
+        yield data, numeri
+
+def leggi_file(nome_file, con_concorso=False):
+    """
+    Legge il file una riga alla volta e restituisce (data, numeri) per ogni
+    estrazione valida, o (concorso, data, numeri) con con_concorso=True: la
+    memoria usata non dipende dalla dimensione del file.
+    """
+    with open(nome_file, 'r', encoding='utf-8') as f:
+        yield from (leggi_estrazioni(f) if con_concorso else leggi_righe(f))
+
+def a_blocchi(estrazioni, dimensione):
+    """Raggruppa le estrazioni in liste di al massimo dimensione elementi."""
+    iteratore = iter(estrazioni)
+    while True:
+        blocco = list(itertools.islice(iteratore, dimensione))
+        if not blocco:
+            return
+        yield blocco
+
+def _inserisci_righe(cursor, righe, insert, errore):
+    """Inserimento riga per riga, usato solo se un blocco fallisce: isola le righe con errore."""
+    inserite = ignorate = errori = 0
+    for riga in righe:
         try:
-            cursor.execute("""
-                INSERT IGNORE INTO estrazioni_reali 
-                (data, n1, n2, n3, n4, n5, n6, n7, n8, n9, n10, n11, n12, n13, n14, n15)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (data, *numeri))
+            cursor.execute(insert, riga)
             if cursor.rowcount == 1:
                 inserite += 1
             else:
                 ignorate += 1
-        except mysql.connector.Error as err:
+        except errore as err:
             print(f"❌ Errore inserimento riga: {err}")
             errori += 1
+    return inserite, ignorate, errori
+
+def carica_estrazioni(conn, righe, batch=BATCH_DEFAULT, insert=INSERT_ESTRAZIONE, errore=None):
+    """
+    Inserisce le righe (parametri di insert) a blocchi di batch righe: executemany
+    le invia come un unico INSERT multi-riga, quindi c'è un round trip (e un commit)
+    per blocco invece che per estrazione. Le righe già presenti vengono contate
+    come ignorate. insert ed errore permettono di usare il backend SQLite locale;
+    senza errore si usa mysql.connector.Error, importato solo in quel caso.
+    """
+    if errore is None:
+        import mysql.connector
+        errore = mysql.connector.Error
+    inserite = 0
+    ignorate = 0
+    errori = 0
+    batch = max(1, int(batch))
+    cursor = conn.cursor()
+
+    for n_blocco, blocco in enumerate(a_blocchi(righe, batch), start=1):
+        try:
+            cursor.executemany(insert, blocco)
+            conn.commit()
+            nuove = max(cursor.rowcount, 0)
+            risultato = (nuove, len(blocco) - nuove, 0)
+        except errore as err:
+            conn.rollback()
+            print(f"⚠️ Blocco {n_blocco} fallito ({err}): ripeto riga per riga.")
+            risultato = _inserisci_righe(cursor, blocco, insert, errore)
+            conn.commit()
+
+        inserite += risultato[0]
+        ignorate += risultato[1]
+        errori += risultato[2]
+        print(f"Blocco {n_blocco}: {len(blocco)} righe, inserite {risultato[0]}, ignorate {risultato[1]}, errori {risultato[2]}")
 
-    conn.commit()
     cursor.close()
     print("✅ Caricamento completato.")
     print(f"✔️ Inserite: {inserite}")
     print(f"⏭️ Ignorate (già presenti): {ignorate}")
     print(f"⚠️ Righe con errore: {errori}")
+    return inserite, ignorate, errori
 
 def main():
     import argparse
@@ -59,27 +119,38 @@ def main():
     parser.add_argument("--user", default="tuo_utente")
     parser.add_argument("--password", default="tua_password")
     parser.add_argument("--database", default="lotterie")
+    parser.add_argument("--batch", type=int, default=BATCH_DEFAULT, help=f"Righe per INSERT multi-riga (default: {BATCH_DEFAULT})")
+    parser.add_argument("--sqlite", nargs='?', const=db_locale.FILE_DB, metavar="FILE_DB",
+                        help=f"Carica nel database SQLite locale invece che in MariaDB (default: {db_locale.FILE_DB})")
     args = parser.parse_args()
 
-    try:
-        conn = mysql.connector.connect(
-            host=args.host,
-            user=args.user,
-            password=args.password,
-            database=args.database
-        )
-    except mysql.connector.Error as err:
-        print(f"Errore nella connessione al DB: {err}")
+    if not os.path.exists(args.nome_file):
+        print(f"Errore: il file '{args.nome_file}' non esiste.")
         return
 
-    estrazioni = leggi_file(args.nome_file)
-    if not estrazioni:
-        print("Nessuna estrazione valida trovata nel file.")
-        return
+    if args.sqlite:
+        conn = db_locale.connetti(args.sqlite)
+        righe = (db_locale.riga(*estrazione) for estrazione in leggi_file(args.nome_file, con_concorso=True))
+        risultato = carica_estrazioni(conn, righe, args.batch, db_locale.INSERT_ESTRAZIONE, sqlite3.Error)
+    else:
+        # Il driver MariaDB serve solo qui: il caricamento in SQLite funziona anche senza
+        import mysql.connector
+        try:
+            conn = mysql.connector.connect(
+                host=args.host,
+                user=args.user,
+                password=args.password,
+                database=args.database
+            )
+        except mysql.connector.Error as err:
+            print(f"Errore nella connessione al DB: {err}")
+            return
+        righe = ((data, *numeri) for data, numeri in leggi_file(args.nome_file))
+        risultato = carica_estrazioni(conn, righe, args.batch)
 
-    carica_estrazioni(conn, estrazioni)
+    if sum(risultato) == 0:
+        print("Nessuna estrazione valida trovata nel file.")
     conn.close()
 
 if __name__ == "__main__":
     main()
-
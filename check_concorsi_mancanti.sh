@@ -3,8 +3,12 @@
 
 # Nome del file che contiene i concorsi
 FILE="./dat/dati.txt"
-# Leggi i numeri dei concorsi dal file
-NUMERI_CONCORSI=($(awk '{print $1}' "$FILE"))
+# Gli scraper aggiornano solo il registro append-only: se esiste si legge quello
+if [ -f "./dat/dati.log" ]; then
+    FILE="./dat/dati.log"
+fi
+# Leggi i numeri dei concorsi dal file (dal più recente, come in dati.txt)
+NUMERI_CONCORSI=($(awk '{print $1}' "$FILE" | sort -rn))
 
 # Trova il minimo e il massimo numero di concorso
 MIN_CONCORSO=${NUMERI_CONCORSI[0]}
@@ -1,143 +1,160 @@
+import argparse
 import time
 import random
 
+import punteggi
+import storico
+
+FILE_DATI = storico.FILE_DATI
+
 def random_delay(min_delay=1, max_delay=3):
     """Introduce un ritardo casuale per simulare il comportamento umano."""
     time.sleep(random.uniform(min_delay, max_delay))
 
-def format_numbers_inplace(file_path):
-    """Formatta i numeri nel file, aggiungendo uno zero iniziale ai numeri a una cifra."""
+def carica_indice(nome_file=FILE_DATI):
+    """
+    Indice concorso -> maschera dei numeri estratti, costruito dal binario di
+    storico.py (ad esempio dat/dati.log.npz, rigenerato solo quando i dati cambiano).
+    Restituisce anche lo Storico, con i concorsi nell'ordine del file.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as infile:
-            lines = infile.readlines()
-        
-        with open(file_path, 'w', encoding='utf-8') as outfile:
-            for line in lines:
-                formatted_line = '\t'.join(f"{int(num):02}" for num in line.split())
-                outfile.write(formatted_line + '\n')
+        dati = storico.carica_storico(nome_file)
     except FileNotFoundError:
-        print(f"❌ Errore: Il file '{file_path}' non esiste.")
+        print(f"❌ Errore: Il file '{nome_file}' non esiste.")
+        return None, None
+    return storico.indice_concorsi(dati), dati
 
-def recupera_numeri_estratti_concorso(concorso_numero):
-    """Recupera i numeri estratti per un determinato concorso dal file './dat/dati.txt'."""
+def recupera_numeri_estratti_concorso(concorso_numero, indice):
+    """Recupera i numeri estratti (stringhe a due cifre) per un concorso dall'indice dei concorsi."""
     try:
-        with open('./dat/dati.txt', 'r', encoding='utf-8') as file:
-            for line in file:
-                # Splitta la linea e recupera il numero del concorso
-                parts = line.split('\t')
-                concorso = parts[0].strip()
-
-                # Se il numero del concorso corrisponde, restituisci i numeri estratti
-                if concorso == str(concorso_numero):
-                    numeri_estratti = set(parts[2:])  # Numeri estratti sono nella terza colonna in avanti
-                    return numeri_estratti
-                
-        print(f"⚠️ Concorso {concorso_numero} non trovato in './dat/dati.txt'.")
-        return set()
-    except FileNotFoundError:
-        print("❌ Errore: Il file './dat/dati.txt' non esiste.")
+        maschera = indice[int(concorso_numero)]
+    except (KeyError, ValueError):
+        print(f"⚠️ Concorso {concorso_numero} non trovato in '{FILE_DATI}'.")
         return set()
-
-def confronta_numeri(giocati, estratti):
-    """Confronta i numeri giocati con quelli estratti."""
-    numeri_indovinati = giocati.intersection(estratti)
-    return numeri_indovinati, len(numeri_indovinati)
-
-def main():
-    # Ricevi il numero del concorso come parametro
-    import sys
-    if len(sys.argv) != 2:
-        print("❌ Usa: python3 check_local.py <numero_concorso | all>")
-        return
-
-    concorso_param = sys.argv[1]
-
-    # Formatta il file puntata.txt prima di utilizzarlo
-    file_puntata = './dat/puntata.txt'
-    format_numbers_inplace(file_puntata)
-    
+    return {f"{n:02}" for n in storico.maschera_a_numeri(maschera)}
+
+def numeri_indovinati(schedina, maschera_estratta):
+    """Numeri in comune tra schedina ed estrazione (maschere a 25 bit), come stringhe a due cifre."""
+    return [f"{n:02}" for n in storico.maschera_a_numeri(int(schedina) & int(maschera_estratta))]
+
+def stampa_riga(idx, riga, indovinati, tot_indovinati):
+    numeri_giocati_sorted = sorted(set(riga.strip().replace("\t", " ").split()))
+    print(f"📝 Risultati per la riga {idx}:")
+    print(f"  Numeri giocati: {', '.join(numeri_giocati_sorted)}")
+    print(f"  Numeri indovinati: {', '.join(indovinati)}")
+    print(f"\033[1m  Totale numeri indovinati: {tot_indovinati}\033[0m")
+    print("-"*50)
+
+def estrazioni_da_controllare(concorso_param, indice, dati):
+    """Concorsi e maschere da controllare (tutti, nell'ordine del file, o uno solo); None se il concorso manca."""
+    if concorso_param == "all":
+        return dati.concorsi.tolist(), dati.maschere
+    if not recupera_numeri_estratti_concorso(concorso_param, indice):
+        return None
+    return [concorso_param], [indice[int(concorso_param)]]
+
+def controlla_in_streaming(file_puntata, concorsi, maschere, blocco, minimo):
+    """
+    Modalità per puntate molto grandi: legge le righe a blocchi e tiene in memoria
+    solo il blocco corrente e l'istogramma delle fasce. Stampa le righe vincenti
+    man mano che le trova (ordinate per numeri indovinati dentro ogni blocco).
+    """
+    istogramma = dict.fromkeys(punteggi.FASCE_PREMIO, 0)
+    righe_totali = 0
+    inizio_tempo = time.perf_counter()
+
+    print(f"\n🏆 Righe con almeno {minimo} numeri indovinati:")
     try:
-        with open(file_puntata, 'r', encoding='utf-8') as f:
-            righe = f.readlines()
+        for prima_riga, righe, schedine in punteggi.blocchi_schedine(file_puntata, blocco):
+            punti = punteggi.matrice_punti(schedine, maschere)
+            for fascia, quante in punteggi.istogramma(punti).items():
+                istogramma[fascia] += quante
+            indici, colonne, valori = punteggi.vincite(punti, minimo)
+            for i, c, v in zip(indici, colonne, valori):
+                print(f"Concorso {concorsi[c]}, Riga {prima_riga + i}: {v} numeri indovinati - {righe[i].strip()}")
+            righe_totali += len(righe)
     except FileNotFoundError:
-        print("❌ File 'puntata.txt' non trovato.")
+        print(f"❌ File '{file_puntata}' non trovato.")
         return
 
-    sommario = []
+    durata = time.perf_counter() - inizio_tempo
+    print("\n📈 Combinazioni vincenti per fascia:")
+    for fascia, quante in istogramma.items():
+        print(f"  {fascia} numeri: {quante}")
+    velocita = righe_totali / durata if durata > 0 else float('inf')
+    print(f"\n⏱️ {righe_totali} righe x {len(concorsi)} concorsi in {durata:.2f} s ({velocita:,.0f} righe/s)")
 
-    if concorso_param == "all":
-        # Se il parametro è "all", controlla tutti i concorsi nel file './dat/dati.txt'
+def main():
+    parser = argparse.ArgumentParser(description="Controlla le righe di puntata.txt contro le estrazioni di dati.txt.")
+    parser.add_argument("concorso", help="Numero del concorso oppure 'all' per tutti i concorsi")
+    parser.add_argument("--puntata", default='./dat/puntata.txt', help="File delle righe giocate (default: ./dat/puntata.txt)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Per puntate molto grandi: lettura a blocchi, solo istogramma e righe vincenti")
+    parser.add_argument("--blocco", type=int, default=punteggi.BLOCCO, help=f"Righe per blocco in streaming (default: {punteggi.BLOCCO})")
+    parser.add_argument("--normalizza", action="store_true",
+                        help="Riscrive la puntata con i numeri a due cifre (di norma la normalizzazione avviene solo in memoria)")
+    parser.add_argument("--minimo", type=int, default=punteggi.FASCE_PREMIO[0], help="Numeri indovinati minimi per elencare una riga (default: 11)")
+    args = parser.parse_args()
+
+    concorso_param = args.concorso
+    file_puntata = args.puntata
+
+    if args.normalizza:
         try:
-            with open('./dat/dati.txt', 'r', encoding='utf-8') as file:
-                for line in file:
-                    parts = line.split('\t')
-                    concorso_numero = parts[0].strip()
-                    
-                    # Recupera i numeri estratti per il concorso corrente
-                    print(f"🔄 Recupero dei numeri estratti per il concorso {concorso_numero}...")
-                    numeri_estratti = recupera_numeri_estratti_concorso(concorso_numero)
-
-                    if numeri_estratti:
-                        numeri_estratti_sorted = sorted(numeri_estratti)
-                        print(f"\nNumeri estratti per il concorso {concorso_numero}: {', '.join(numeri_estratti_sorted)}\n")
-                        print("="*50)
-
-                        # Confronto tra i numeri giocati e quelli estratti per ogni riga
-                        for idx, riga in enumerate(righe, start=1):
-                            numeri_giocati = set(riga.strip().replace("\t", " ").split())
-                            numeri_giocati_sorted = sorted(numeri_giocati)
-
-                            numeri_indovinati, tot_indovinati = confronta_numeri(numeri_giocati, numeri_estratti)
-                            numeri_indovinati_sorted = sorted(numeri_indovinati)
-
-                            print(f"📝 Risultati per la riga {idx}:")
-                            print(f"  Numeri giocati: {', '.join(numeri_giocati_sorted)}")
-                            print(f"  Numeri indovinati: {', '.join(numeri_indovinati_sorted)}")
-                            print(f"\033[1m  Totale numeri indovinati: {tot_indovinati}\033[0m")
-                            print("-"*50)
-
-                            # Aggiungi il risultato al sommario, solo se indovinati 11, 12, 13, 14 o 15 numeri
-                            if tot_indovinati in [11, 12, 13, 14, 15]:
-                                sommario.append((concorso_numero, idx, tot_indovinati))
-
+            print(f"✏️ Righe normalizzate in '{file_puntata}': {punteggi.normalizza_file(file_puntata)}")
         except FileNotFoundError:
-            print("❌ Errore: Il file './dat/dati.txt' non esiste.")
+            print(f"❌ File '{file_puntata}' non trovato.")
             return
-    else:
-        # Se il parametro è un numero di concorso, controlla solo quel concorso
-        print(f"🔄 Recupero dei numeri estratti per il concorso {concorso_param}...")
-        numeri_estratti = recupera_numeri_estratti_concorso(concorso_param)
 
-        if not numeri_estratti:
+    if args.streaming:
+        indice, dati = carica_indice()
+        if indice is None:
+            return
+        da_controllare = estrazioni_da_controllare(concorso_param, indice, dati)
+        if da_controllare is None:
             print("⚠️ Non sono riuscito a recuperare i numeri estratti.")
             return
+        controlla_in_streaming(file_puntata, *da_controllare, max(1, args.blocco), args.minimo)
+        return
 
-        numeri_estratti_sorted = sorted(numeri_estratti)
-        print(f"\nNumeri estratti per il concorso {concorso_param}: {', '.join(numeri_estratti_sorted)}\n")
-        print("="*50)
+    # Righe normalizzate e maschere dalla cache della puntata (il file non viene riscritto)
+    try:
+        righe, schedine = punteggi.carica_schedine(file_puntata)
+    except FileNotFoundError:
+        print(f"❌ File '{file_puntata}' non trovato.")
+        return
 
-        # Confronto tra i numeri giocati e quelli estratti per ogni riga
-        for idx, riga in enumerate(righe, start=1):
-            numeri_giocati = set(riga.strip().replace("\t", " ").split())
-            numeri_giocati_sorted = sorted(numeri_giocati)
+    indice, dati = carica_indice()
+    if indice is None:
+        return
+
+    # Con "all" si controllano tutti i concorsi di FILE_DATI in un solo passaggio
+    da_controllare = estrazioni_da_controllare(concorso_param, indice, dati)
+    if da_controllare is None:
+        print("⚠️ Non sono riuscito a recuperare i numeri estratti.")
+        return
+    concorsi, maschere = da_controllare
 
-            numeri_indovinati, tot_indovinati = confronta_numeri(numeri_giocati, numeri_estratti)
-            numeri_indovinati_sorted = sorted(numeri_indovinati)
+    # Numeri indovinati di ogni riga contro ogni estrazione, calcolati in blocco
+    punti = punteggi.matrice_punti(schedine, maschere)
 
-            print(f"📝 Risultati per la riga {idx}:")
-            print(f"  Numeri giocati: {', '.join(numeri_giocati_sorted)}")
-            print(f"  Numeri indovinati: {', '.join(numeri_indovinati_sorted)}")
-            print(f"\033[1m  Totale numeri indovinati: {tot_indovinati}\033[0m")
-            print("-"*50)
+    for colonna, concorso_numero in enumerate(concorsi):
+        print(f"🔄 Recupero dei numeri estratti per il concorso {concorso_numero}...")
+        maschera_estratta = maschere[colonna]
+        numeri_estratti_sorted = [f"{n:02}" for n in storico.maschera_a_numeri(maschera_estratta)]
+        print(f"\nNumeri estratti per il concorso {concorso_numero}: {', '.join(numeri_estratti_sorted)}\n")
+        print("="*50)
 
-            # Aggiungi il risultato al sommario, solo se indovinati 11, 12, 13, 14 o 15 numeri
-            if tot_indovinati in [11, 12, 13, 14, 15]:
-                sommario.append((concorso_param, idx, tot_indovinati))
+        # Risultati per ogni riga giocata
+        for idx, riga in enumerate(righe, start=1):
+            tot_indovinati = int(punti[idx - 1, colonna])
+            stampa_riga(idx, riga, numeri_indovinati(schedine[idx - 1], maschera_estratta), tot_indovinati)
 
-    # Ordinamento del sommario in ordine decrescente per numero di numeri indovinati
-    sommario.sort(key=lambda x: x[2], reverse=True)
+    # Sommario: solo le righe con 11, 12, 13, 14 o 15 numeri indovinati
+    colonne, indici, valori = punteggi.vincite(punti.T)
+    sommario = [(concorsi[c], i + 1, int(v)) for c, i, v in zip(colonne, indici, valori)]
 
-    # Visualizzazione del sommario
+    # Visualizzazione del sommario (già ordinato per numeri indovinati decrescenti)
     print("\n📊 Sommario dei risultati (ordinato per numeri indovinati):")
     for concorso_numero, riga_idx, tot_indovinati in sommario:
         if tot_indovinati in [11, 12, 13, 14]:
@@ -147,6 +164,10 @@ def main():
         else:
             print(f"Concorso {concorso_numero}, Riga {riga_idx}: {tot_indovinati} numeri indovinati")
 
+    print("\n📈 Combinazioni vincenti per fascia:")
+    for fascia, quante in punteggi.istogramma(punti).items():
+        print(f"  {fascia} numeri: {quante}")
+
 if __name__ == "__main__":
     main()
 
@@ -8,23 +8,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+import punteggi
+
 def random_delay(min_delay=1, max_delay=3):
     """Introduce un ritardo casuale per simulare il comportamento umano."""
     time.sleep(random.uniform(min_delay, max_delay))
 
-def format_numbers_inplace(file_path):
-    """Formatta i numeri nel file, aggiungendo uno zero iniziale ai numeri a una cifra."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as infile:
-            lines = infile.readlines()
-        
-        with open(file_path, 'w', encoding='utf-8') as outfile:
-            for line in lines:
-                formatted_line = '\t'.join(f"{int(num):02}" for num in line.split())
-                outfile.write(formatted_line + '\n')
-    except FileNotFoundError:
-        print(f"❌ Errore: Il file '{file_path}' non esiste.")
-
 def recupera_numeri_estratti_e_concorso():
     """Recupera i numeri estratti e il numero del concorso e la data dalla pagina Lotofácil."""
     chrome_options = Options()
@@ -74,12 +63,9 @@ def confronta_numeri(giocati, estratti):
 def main():
     file_puntata = './dat/puntata.txt'
     
-    # Formatta il file prima di utilizzarlo
-    format_numbers_inplace(file_puntata)
-    
+    # Righe normalizzate in memoria: puntata.txt non viene riscritto
     try:
-        with open(file_puntata, 'r', encoding='utf-8') as f:
-            righe = f.readlines()
+        righe = punteggi.carica_schedine(file_puntata).righe
     except FileNotFoundError:
         print("❌ File 'puntata.txt' non trovato.")
         return
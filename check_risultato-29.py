@@ -9,6 +9,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from tabulate import tabulate
 
+import punteggi
+
 class Colori:
     ROSSO = '\033[91m'
     VERDE = '\033[92m'
@@ -21,23 +23,6 @@ class Colori:
 def random_delay(min_delay=1, max_delay=3):
     time.sleep(random.uniform(min_delay, max_delay))
 
-def format_numbers_inplace(file_path):
-    try:
-        with open(file_path, 'r+', encoding='utf-8') as f:
-            lines = []
-            for i, line in enumerate(f, 1):
-                try:
-                    nums = [f"{int(num.strip()):02}" for num in line.split()]
-                    lines.append('\t'.join(nums) + '\n')
-                except ValueError:
-                    print(f"{Colori.ROSSO}⚠️ Errore formato riga {i}: {line.strip()}{Colori.RESET}")
-                    lines.append(line)
-            f.seek(0)
-            f.writelines(lines)
-            f.truncate()
-    except FileNotFoundError:
-        print(f"{Colori.ROSSO}❌ Errore: Il file '{file_path}' non esiste.{Colori.RESET}")
-
 def recupera_numeri_estratti_e_concorso():
     chrome_options = Options()
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -86,12 +71,9 @@ def main():
     
     file_puntata = './dat/puntata.txt'
     
-    # Formatta il file prima di utilizzarlo
-    format_numbers_inplace(file_puntata)
-    
+    # Righe normalizzate in memoria: puntata.txt non viene riscritto
     try:
-        with open(file_puntata, 'r', encoding='utf-8') as f:
-            righe = f.readlines()
+        righe = punteggi.carica_schedine(file_puntata).righe
     except FileNotFoundError:
         print(f"{Colori.ROSSO}❌ File 'puntata.txt' non trovato.{Colori.RESET}")
         return
@@ -0,0 +1,207 @@
+"""
+Istantanea colonnare (Arrow IPC / Feather v2) dello storico delle estrazioni.
+
+Ogni consumatore altrimenti rilegge il testo o interroga il DB. L'istantanea
+salva lo storico accanto ai dati (dat/dati.txt -> dat/dati.txt.arrow) come una
+tabella Arrow non compressa con le colonne concorso (int32), data (date32) e
+n1..n15 (uint8), in ordine di concorso crescente. Il file viene aperto in
+memory map: pandas (app.py) e NumPy leggono le colonne senza copiarle né
+riconvertirle.
+
+Come per statistiche.py, l'istantanea porta con sé la firma dei dati da cui è
+stata generata. Per un file di testo è legata a dimensione e mtime e viene
+rigenerata quando cambia; per il registro append-only (dat/dati.log) si
+convertono solo i record scritti dopo l'istantanea e si accodano a quelli già
+presenti.
+
+Uso da riga di comando:
+    python3 colonnare.py esporta dat/dati.log [--parquet dat/dati.parquet]
+    python3 colonnare.py importa dat/dati.parquet dat/dati.log
+"""
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc
+
+import registro
+import storico
+
+COLONNE_NUMERI = [f"n{i}" for i in range(1, storico.NUMERI_PER_ESTRAZIONE + 1)]
+
+SCHEMA = pa.schema(
+    [('concorso', pa.int32()), ('data', pa.date32())]
+    + [(colonna, pa.uint8()) for colonna in COLONNE_NUMERI]
+)
+
+
+def file_predefinito():
+    """Sorgente predefinita: LOTOF_STORICO, altrimenti il registro se esiste, altrimenti dati.txt."""
+    if os.getenv("LOTOF_STORICO"):
+        return os.getenv("LOTOF_STORICO")
+    return storico.sorgente(storico.FILE_TESTO)
+
+
+def file_istantanea(nome_file):
+    """Percorso dell'istantanea associata al file dei dati."""
+    return nome_file + '.arrow'
+
+
+def da_storico(dati):
+    """Tabella Arrow dallo Storico (maschere a 25 bit), in ordine di concorso crescente."""
+    ordine = np.argsort(dati.concorsi, kind='stable')
+    if len(ordine):
+        numeri = storico.matrice_numeri(dati.maschere[ordine])
+    else:
+        numeri = np.zeros((0, storico.NUMERI_PER_ESTRAZIONE), dtype=np.uint8)
+    colonne = [
+        pa.array(dati.concorsi[ordine], type=pa.int32()),
+        pa.array(dati.date[ordine], type=pa.date32()),
+    ]
+    colonne += [pa.array(numeri[:, i], type=pa.uint8()) for i in range(numeri.shape[1])]
+    return pa.Table.from_arrays(colonne, schema=SCHEMA)
+
+
+def _leggi(percorso):
+    """Restituisce (tabella in memory map, firma) o (None, None) se l'istantanea non è leggibile."""
+    try:
+        tabella = pa.ipc.open_file(pa.memory_map(percorso, 'r')).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None, None
+    metadati = tabella.schema.metadata or {}
+    if b'firma' not in metadati or not tabella.schema.remove_metadata().equals(SCHEMA):
+        return None, None
+    firma = np.array([int(v) for v in metadati[b'firma'].split(b',')], dtype=np.int64)
+    return tabella, firma
+
+
+def salva_istantanea(tabella, percorso, firma):
+    """Scrive l'istantanea in un solo blocco non compresso, in modo atomico (temporaneo + rename)."""
+    tabella = tabella.combine_chunks().replace_schema_metadata(
+        {'firma': ','.join(str(int(v)) for v in firma)}
+    )
+    temporaneo = percorso + '.tmp'
+    try:
+        with pa.OSFile(temporaneo, 'wb') as f:
+            with pa.ipc.new_file(f, tabella.schema) as writer:
+                writer.write_table(tabella)
+        os.replace(temporaneo, percorso)
+    except OSError as e:
+        print(f"Impossibile salvare l'istantanea '{percorso}': {e}")
+    return tabella
+
+
+def _da_registro(nome_file, percorso):
+    """
+    Per il registro la firma è (lunghezza coperta, numero di record): si
+    convertono solo i record scritti dopo l'istantanea. Se il registro è stato
+    troncato o riscritto si rigenera tutto.
+    """
+    reg = registro.Registro(nome_file)
+    tabella, firma = _leggi(percorso)
+    if tabella is not None and len(firma) == 2 and firma[0] <= reg.lunghezza:
+        if firma[0] == reg.lunghezza and firma[1] == len(reg):
+            return tabella
+        righe = reg.righe_da(int(firma[0]))
+        if firma[1] + len(righe) != len(reg):
+            tabella = None
+        else:
+            tabella = pa.concat_tables([tabella.replace_schema_metadata(None), da_storico(storico.da_righe(righe))])
+            concorsi = tabella.column('concorso').to_numpy()
+            if np.any(np.diff(concorsi) < 0):
+                tabella = tabella.sort_by('concorso')
+    else:
+        tabella = None
+
+    if tabella is None:
+        tabella = da_storico(storico.da_righe(reg.righe_da(0)))
+    salva_istantanea(tabella, percorso, np.array([reg.lunghezza, len(reg)], dtype=np.int64))
+    tabella, _ = _leggi(percorso)
+    return tabella
+
+
+def carica_tabella(nome_file=None):
+    """
+    Restituisce lo storico come tabella Arrow in memory map, riusando
+    l'istantanea e aggiornandola se il file dei dati è cambiato. Va richiamata
+    dopo ogni aggiunta al registro per mantenere l'istantanea allineata.
+    """
+    nome_file = storico.sorgente(nome_file) if nome_file else file_predefinito()
+    percorso = file_istantanea(nome_file)
+    if nome_file.endswith('.log'):
+        tabella = _da_registro(nome_file, percorso)
+    else:
+        firma = storico.firma_file(nome_file)
+        tabella, firma_salvata = _leggi(percorso)
+        if tabella is None or not np.array_equal(firma_salvata, firma):
+            salva_istantanea(da_storico(storico.carica_storico(nome_file)), percorso, firma)
+            tabella, _ = _leggi(percorso)
+    if tabella is None:
+        # Istantanea non scrivibile: si lavora sulla tabella in memoria
+        return da_storico(storico.leggi_testo(nome_file))
+    return tabella
+
+
+def carica_dataframe(nome_file=None):
+    """DataFrame con le colonne di estrazioni_reali (data, n1..n15) più il concorso."""
+    df = carica_tabella(nome_file).to_pandas(split_blocks=True, date_as_object=False)
+    return df[['data'] + COLONNE_NUMERI + ['concorso']]
+
+
+def matrice(tabella):
+    """Matrice uint8 N x 15 dei numeri (le singole colonne sono lette senza copia)."""
+    return np.column_stack([tabella.column(c).to_numpy() for c in COLONNE_NUMERI])
+
+
+def leggi_file(percorso):
+    """Legge un'istantanea .arrow/.feather o un file .parquet esportato."""
+    if percorso.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(percorso).select(SCHEMA.names).cast(SCHEMA)
+    return pa.ipc.open_file(pa.memory_map(percorso, 'r')).read_all().select(SCHEMA.names)
+
+
+def esporta_parquet(tabella, percorso):
+    """Scrive la tabella in Parquet (compresso, per archivio o scambio)."""
+    import pyarrow.parquet as pq
+    pq.write_table(tabella.replace_schema_metadata(None), percorso)
+
+
+def importa(percorso, percorso_registro=registro.FILE_REGISTRO):
+    """Aggiunge al registro le estrazioni di un file .arrow/.parquet (dal concorso più vecchio)."""
+    tabella = leggi_file(percorso).sort_by('concorso')
+    concorsi = tabella.column('concorso').to_pylist()
+    date = tabella.column('data').to_pylist()
+    numeri = matrice(tabella)
+    righe = [
+        registro.formatta_riga(concorso, data.strftime('%d/%m/%Y'), numeri[i])
+        for i, (concorso, data) in enumerate(zip(concorsi, date))
+    ]
+    return registro.Registro(percorso_registro).aggiungi_righe(righe)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Istantanea colonnare Arrow/Parquet dello storico.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_esp = sub.add_parser('esporta', help="Aggiorna l'istantanea .arrow accanto ai dati")
+    p_esp.add_argument('nome_file', nargs='?', default=file_predefinito())
+    p_esp.add_argument('--parquet', help="Scrive anche una copia Parquet")
+    p_imp = sub.add_parser('importa', help="Importa un file .arrow/.parquet nel registro")
+    p_imp.add_argument('percorso')
+    p_imp.add_argument('registro', nargs='?', default=registro.FILE_REGISTRO)
+    args = parser.parse_args()
+
+    if args.comando == 'esporta':
+        tabella = carica_tabella(args.nome_file)
+        print(f"Istantanea '{file_istantanea(storico.sorgente(args.nome_file))}': {tabella.num_rows} estrazioni.")
+        if args.parquet:
+            esporta_parquet(tabella, args.parquet)
+            print(f"Parquet scritto in '{args.parquet}'.")
+    else:
+        aggiunte = importa(args.percorso, args.registro)
+        print(f"Importate {aggiunte} estrazioni in '{args.registro}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Conteggio compatto delle combinazioni simulate tramite rango colessicografico.
+
+Una combinazione ordinata c_0 < c_1 < ... < c_{k-1} di indici in 0..n-1 ha
+rango sum(C(c_i, i + 1)), un intero in [0, C(n, k)). Per la Lotofácil
+C(25, 15) = 3.268.760, quindi i conteggi stanno in un array uint32 denso
+(circa 13 MB); per spazi più grandi (es. 15 su 90) si usa un array ordinato
+di ranghi uint64 con i relativi conteggi. In entrambi i casi l'aggiornamento
+e l'estrazione dei top-k sono vettorizzati e ogni combinazione distinta costa
+pochi byte invece di una tupla più una voce di dizionario.
+"""
+import math
+
+import numpy as np
+
+SOGLIA_DENSO = 1 << 24  # oltre 16M combinazioni possibili si passa al formato sparso
+_ATTESA_MAX = 1 << 22  # ranghi accumulati prima di compattare il formato sparso
+
+
+def tabella_binomiali(n, k):
+    """Matrice uint64 n x (k+1) con C(i, j) alla riga i, colonna j."""
+    if math.comb(n, k) >= 1 << 63:
+        raise ValueError(f"C({n}, {k}) non è rappresentabile su 64 bit.")
+    tabella = np.zeros((n, k + 1), dtype=np.uint64)
+    for i in range(n):
+        for j in range(min(i, k) + 1):
+            tabella[i, j] = math.comb(i, j)
+    return tabella
+
+
+def ranghi(blocco, tabella):
+    """Rango colessicografico di ogni riga (indici in ordine crescente) del blocco."""
+    blocco = np.asarray(blocco)
+    colonne = np.arange(1, blocco.shape[1] + 1)
+    return tabella[blocco, colonne].sum(axis=1, dtype=np.uint64)
+
+
+def da_ranghi(r, tabella, k):
+    """Inverso di ranghi(): restituisce la matrice (len(r), k) degli indici crescenti."""
+    r = np.array(r, dtype=np.uint64, copy=True)
+    risultato = np.empty((len(r), k), dtype=np.intp)
+    for i in range(k, 0, -1):
+        colonna = tabella[:, i]
+        # Il più grande c con C(c, i) <= r (la colonna è non decrescente in c)
+        c = np.searchsorted(colonna, r, side='right') - 1
+        risultato[:, i - 1] = c
+        r -= colonna[c]
+    return risultato
+
+
+class ContatoreCombinazioni:
+    """
+    Conta combinazioni di k elementi scelti tra i valori dati, con
+    un'interfaccia minima compatibile con Counter (most_common, items, len).
+    """
+
+    def __init__(self, valori, k=15, soglia_denso=SOGLIA_DENSO):
+        self.valori = np.asarray(valori)
+        self.k = k
+        n = len(self.valori)
+        self.tabella = tabella_binomiali(n, k)
+        self.possibili = math.comb(n, k)
+        self.totale = 0
+        self.denso = self.possibili <= soglia_denso
+        if self.denso:
+            self._conteggi = np.zeros(self.possibili, dtype=np.uint32)
+        else:
+            self._ranghi = np.empty(0, dtype=np.uint64)
+            self._conteggi = np.empty(0, dtype=np.uint32)
+            self._in_attesa = []
+            self._n_attesa = 0
+
+    def aggiungi(self, blocco):
+        """Aggiunge un blocco (b, k) di indici crescenti nell'array dei valori."""
+        r = ranghi(blocco, self.tabella)
+        self.totale += len(r)
+        if self.denso:
+            unici, conteggi = np.unique(r, return_counts=True)
+            self._conteggi[unici] += conteggi.astype(np.uint32)
+        else:
+            self._accoda(r, np.ones(len(r), dtype=np.uint32))
+
+    def unisci(self, altro):
+        """Somma nel contatore i conteggi di un altro contatore con gli stessi valori e k."""
+        self.totale += altro.totale
+        if self.denso:
+            self._conteggi += altro._conteggi
+        else:
+            self._accoda(*altro._ranghi_e_conteggi())
+
+    def _accoda(self, r, conteggi):
+        self._in_attesa.append((r, conteggi))
+        self._n_attesa += len(r)
+        if self._n_attesa >= _ATTESA_MAX:
+            self._compatta()
+
+    def _compatta(self):
+        if not self._in_attesa:
+            return
+        tutti = np.concatenate([self._ranghi] + [r for r, _ in self._in_attesa])
+        pesi = np.concatenate([self._conteggi] + [c for _, c in self._in_attesa])
+        self._ranghi, inverso = np.unique(tutti, return_inverse=True)
+        self._conteggi = np.bincount(inverso, weights=pesi).astype(np.uint32)
+        self._in_attesa = []
+        self._n_attesa = 0
+
+    def _ranghi_e_conteggi(self):
+        if self.denso:
+            r = np.flatnonzero(self._conteggi)
+            return r.astype(np.uint64), self._conteggi[r]
+        self._compatta()
+        return self._ranghi, self._conteggi
+
+    def _combinazioni(self, r):
+        indici = da_ranghi(r, self.tabella, self.k)
+        return [tuple(riga) for riga in self.valori[indici].tolist()]
+
+    def most_common(self, n=None):
+        """Le n combinazioni più frequenti come lista di (tupla, conteggio)."""
+        r, conteggi = self._ranghi_e_conteggi()
+        if n is not None and n < len(conteggi):
+            scelti = np.argpartition(conteggi, len(conteggi) - n)[len(conteggi) - n:]
+        else:
+            scelti = np.arange(len(conteggi))
+        scelti = scelti[np.argsort(conteggi[scelti], kind='stable')[::-1]]
+        return list(zip(self._combinazioni(r[scelti]), conteggi[scelti].tolist()))
+
+    def conteggi_di(self, combinazioni):
+        """
+        Array dei conteggi delle combinazioni indicate (sequenze di k valori),
+        cercate per rango: 0 per quelle mai uscite o con valori estranei.
+        """
+        posizioni = {valore: i for i, valore in enumerate(self.valori.tolist())}
+        risultato = np.zeros(len(combinazioni), dtype=np.int64)
+        righe, indici = [], []
+        for riga, combinazione in enumerate(combinazioni):
+            indice = sorted({posizioni.get(valore, -1) for valore in combinazione})
+            if len(indice) == self.k and indice[0] >= 0:
+                righe.append(riga)
+                indici.append(indice)
+        if not indici:
+            return risultato
+        r = ranghi(np.array(indici), self.tabella)
+        if self.denso:
+            risultato[righe] = self._conteggi[r]
+        else:
+            presenti, conteggi = self._ranghi_e_conteggi()
+            if len(presenti):
+                posizione = np.minimum(np.searchsorted(presenti, r), len(presenti) - 1)
+                trovati = presenti[posizione] == r
+                risultato[np.array(righe)[trovati]] = conteggi[posizione[trovati]]
+        return risultato
+
+    def probabilita(self, combinazioni=(), top=0):
+        """
+        Frequenze relative (conteggio / totale) delle combinazioni indicate
+        uscite almeno una volta e delle top più frequenti, come {tupla: frequenza}.
+        Solo queste vengono convertite in tuple: le altre restano nei ranghi.
+        """
+        combinazioni = list(dict.fromkeys(tuple(c) for c in combinazioni))
+        totale = max(self.totale, 1)
+        risultato = {
+            combinazione: int(conteggio) / totale
+            for combinazione, conteggio in zip(combinazioni, self.conteggi_di(combinazioni))
+            if conteggio
+        }
+        if top > 0:
+            for combinazione, conteggio in self.most_common(top):
+                risultato[combinazione] = conteggio / totale
+        return risultato
+
+    def items(self):
+        return self.most_common()
+
+    def __len__(self):
+        return len(self._ranghi_e_conteggi()[1])
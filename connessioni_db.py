@@ -0,0 +1,80 @@
+"""
+Registro dei motori SQLAlchemy condivisi dalle dashboard.
+
+create_engine crea un pool di connessioni nuovo: chiamarlo a ogni "Carica
+Dati" (o a ogni aggiornamento in app3/app4) significa rifare ogni volta
+connessione e handshake TLS verso SkySQL e lasciare aperti i pool precedenti.
+Qui i motori vengono creati una volta per URL di connessione e riusati, con
+pool limitati, verifica della connessione prima dell'uso (pre-ping) e
+riciclo delle connessioni vecchie; i motori inutilizzati da troppo tempo, o
+in eccesso rispetto al massimo, vengono chiusi con dispose(). Gli URL sqlite://
+del backend locale (db_locale.py) usano il pool predefinito di SQLAlchemy.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine
+
+POOL_SIZE = 2
+MAX_OVERFLOW = 3
+POOL_RECYCLE = 1800  # secondi: evita connessioni chiuse lato server
+INATTIVITA_MAX = 900  # secondi senza uso dopo cui un motore viene chiuso
+MAX_MOTORI = 8
+
+_motori = OrderedDict()  # url -> (motore, ultimo uso)
+_lock = threading.Lock()
+
+
+def _chiudi(motore_db):
+    try:
+        motore_db.dispose()
+    except Exception as e:
+        print(f"Errore nella chiusura del pool: {e}")
+
+
+def _sfoltisci(adesso):
+    """Chiude i motori inattivi e quelli meno usati oltre MAX_MOTORI (con il lock preso)."""
+    for url, (motore_db, ultimo_uso) in list(_motori.items()):
+        if adesso - ultimo_uso > INATTIVITA_MAX:
+            del _motori[url]
+            _chiudi(motore_db)
+    while len(_motori) > MAX_MOTORI:
+        _, (motore_db, _) = _motori.popitem(last=False)
+        _chiudi(motore_db)
+
+
+def motore(url, **opzioni):
+    """Restituisce il motore associato all'URL, creandolo alla prima richiesta."""
+    adesso = time.monotonic()
+    with _lock:
+        if url in _motori:
+            motore_db = _motori[url][0]
+        elif url.startswith('sqlite'):
+            # File locale: niente handshake da risparmiare, SQLAlchemy sceglie il pool adatto
+            motore_db = create_engine(url, **opzioni)
+        else:
+            motore_db = create_engine(
+                url,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_pre_ping=True,
+                pool_recycle=POOL_RECYCLE,
+                **opzioni,
+            )
+        _motori[url] = (motore_db, adesso)
+        _motori.move_to_end(url)
+        _sfoltisci(adesso)
+        return motore_db
+
+
+def chiudi_tutti():
+    """Chiude tutti i pool (chiamata anche all'uscita del processo)."""
+    with _lock:
+        while _motori:
+            _, (motore_db, _) = _motori.popitem()
+            _chiudi(motore_db)
+
+
+atexit.register(chiudi_tutti)
@@ -0,0 +1,167 @@
+"""
+Motore delle co-occorrenze: quante volte ogni coppia e ogni terna di numeri
+è uscita insieme, su tutto lo storico o su una finestra di concorsi/date.
+
+In un solo passaggio vettorizzato sullo storico a bitset si calcolano, per ogni
+estrazione, i ranghi colessicografici delle sue C(15, 2) = 105 coppie e
+C(15, 3) = 455 terne (vedi combinazioni.py) e se ne tengono le somme prefisse
+lungo i concorsi: le 300 coppie e le 2300 terne possibili su 25 numeri
+occupano poche decine di MB anche per tutto lo storico. Il conteggio su una
+finestra qualsiasi è la differenza di due righe delle somme prefisse, quindi
+interrogazioni come "le coppie più frequenti negli ultimi 200 concorsi"
+costano microsecondi indipendentemente dalla lunghezza dello storico.
+
+Uso da riga di comando:
+    python3 cooccorrenze.py dat/dati.txt --ultimi 200 --top 10
+"""
+import argparse
+import datetime
+import itertools
+import math
+import os
+
+import numpy as np
+
+import combinazioni
+import storico
+
+
+def _posizioni(k):
+    """Indici (C(15, k), k) delle posizioni che formano le k-uple di un'estrazione."""
+    return np.array(list(itertools.combinations(range(storico.NUMERI_PER_ESTRAZIONE), k)), dtype=np.intp)
+
+
+class Cooccorrenze:
+    """
+    Somme prefisse dei conteggi di numeri, coppie e terne, con le estrazioni
+    ordinate dal concorso più vecchio al più recente.
+    """
+
+    def __init__(self, dati):
+        ordine = np.argsort(dati.concorsi, kind='stable')
+        self.concorsi = dati.concorsi[ordine]
+        self.date = dati.date[ordine]
+        maschere = dati.maschere[ordine]
+        n = len(maschere)
+        tipo = np.uint16 if n < np.iinfo(np.uint16).max else np.int32
+
+        self._kuple = {}
+        self._cumulate = {1: self._prefissi(storico.matrice_bit(maschere), tipo)}
+        if n:
+            indici = storico.matrice_numeri(maschere).astype(np.intp) - 1
+        else:
+            indici = np.zeros((0, storico.NUMERI_PER_ESTRAZIONE), dtype=np.intp)
+        for k in (2, 3):
+            tabella = combinazioni.tabella_binomiali(storico.NUMERI, k)
+            possibili = math.comb(storico.NUMERI, k)
+            posizioni = _posizioni(k)
+            ranghi = combinazioni.ranghi(indici[:, posizioni].reshape(-1, k), tabella)
+            presenze = np.zeros((n, possibili), dtype=bool)
+            presenze[np.repeat(np.arange(n), len(posizioni)), ranghi.astype(np.intp)] = True
+            self._kuple[k] = combinazioni.da_ranghi(np.arange(possibili), tabella, k)
+            self._cumulate[k] = self._prefissi(presenze, tipo)
+
+    @staticmethod
+    def _prefissi(presenze, tipo):
+        cumulate = np.zeros((len(presenze) + 1, presenze.shape[1]), dtype=tipo)
+        np.cumsum(presenze, axis=0, dtype=tipo, out=cumulate[1:])
+        return cumulate
+
+    def __len__(self):
+        return len(self.concorsi)
+
+    def finestra(self, ultimi=None, dal=None, al=None):
+        """
+        Intervallo [inizio, fine) di estrazioni: gli ultimi N concorsi oppure
+        le estrazioni con data tra dal e al (incluse, datetime.date o 'AAAA-MM-GG').
+        """
+        inizio, fine = 0, len(self)
+        if dal is not None:
+            inizio = int(np.searchsorted(self.date, np.datetime64(dal, 'D'), side='left'))
+        if al is not None:
+            fine = int(np.searchsorted(self.date, np.datetime64(al, 'D'), side='right'))
+        if ultimi is not None:
+            inizio = max(inizio, fine - int(ultimi))
+        return inizio, max(inizio, fine)
+
+    def _conteggi(self, k, finestra):
+        inizio, fine = finestra
+        cumulate = self._cumulate[k]
+        return cumulate[fine].astype(np.int64) - cumulate[inizio]
+
+    def frequenze(self, **finestra):
+        """Array di 25 conteggi (indice n-1 = numero n) nella finestra."""
+        return self._conteggi(1, self.finestra(**finestra))
+
+    def coppie(self, **finestra):
+        """Matrice simmetrica 25 x 25 delle uscite congiunte; la diagonale è vuota."""
+        conteggi = self._conteggi(2, self.finestra(**finestra))
+        i, j = self._kuple[2].T
+        matrice = np.zeros((storico.NUMERI, storico.NUMERI), dtype=np.int64)
+        matrice[i, j] = conteggi
+        matrice[j, i] = conteggi
+        return matrice
+
+    def triple(self, **finestra):
+        """Tensore simmetrico 25 x 25 x 25 delle uscite congiunte di tre numeri."""
+        conteggi = self._conteggi(3, self.finestra(**finestra))
+        tensore = np.zeros((storico.NUMERI,) * 3, dtype=np.int64)
+        for permutazione in itertools.permutations(range(3)):
+            tensore[tuple(self._kuple[3][:, permutazione].T)] = conteggi
+        return tensore
+
+    def _top(self, k, n, finestra):
+        conteggi = self._conteggi(k, finestra)
+        n = min(n, len(conteggi))
+        scelti = np.argpartition(conteggi, len(conteggi) - n)[len(conteggi) - n:]
+        scelti = scelti[np.argsort(conteggi[scelti], kind='stable')[::-1]]
+        kuple = (self._kuple[k][scelti] + 1).tolist()
+        return [(tuple(t), int(c)) for t, c in zip(kuple, conteggi[scelti])]
+
+    def top_coppie(self, n=10, **finestra):
+        """Le n coppie di numeri uscite insieme più spesso, come lista di ((a, b), conteggio)."""
+        return self._top(2, n, self.finestra(**finestra))
+
+    def top_triple(self, n=10, **finestra):
+        """Le n terne di numeri uscite insieme più spesso, come lista di ((a, b, c), conteggio)."""
+        return self._top(3, n, self.finestra(**finestra))
+
+
+def carica_cooccorrenze(nome_file=storico.FILE_DATI):
+    """Costruisce il motore a partire dallo storico (letto tramite la cache binaria)."""
+    return Cooccorrenze(storico.carica_storico(nome_file))
+
+
+def _data(testo):
+    return datetime.datetime.strptime(testo, '%d/%m/%Y').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coppie e terne di numeri uscite più spesso insieme.")
+    parser.add_argument("nome_file", nargs='?', default=storico.FILE_DATI, help=f"File delle estrazioni (default: {storico.FILE_DATI})")
+    parser.add_argument("--ultimi", type=int, default=None, help="Considera solo gli ultimi N concorsi")
+    parser.add_argument("--dal", type=_data, default=None, help="Data iniziale (GG/MM/AAAA)")
+    parser.add_argument("--al", type=_data, default=None, help="Data finale (GG/MM/AAAA)")
+    parser.add_argument("--top", type=int, default=10, help="Quanti risultati mostrare (default: 10)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.nome_file):
+        print(f"Errore: il file '{args.nome_file}' non esiste.")
+        return
+
+    motore = carica_cooccorrenze(args.nome_file)
+    finestra = dict(ultimi=args.ultimi, dal=args.dal, al=args.al)
+    inizio, fine = motore.finestra(**finestra)
+    print(f"Estrazioni considerate: {fine - inizio}")
+
+    print("\nCoppie più frequenti:")
+    for coppia, conteggio in motore.top_coppie(args.top, **finestra):
+        print(f"  {coppia}: {conteggio}")
+
+    print("\nTerne più frequenti:")
+    for terna, conteggio in motore.top_triple(args.top, **finestra):
+        print(f"  {terna}: {conteggio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Backend locale SQLite (estrazioni.db) con lo stesso schema di estrazioni_reali.
+
+Le dashboard e gli script dipendono altrimenti da SkySQL/MariaDB o dal
+parsing di dati.txt: con una copia locale le query girano in pochi
+millisecondi e senza rete. Rispetto alla tabella MariaDB ci sono due colonne
+in più: il numero di concorso e la maschera a 25 bit dell'estrazione (come in
+storico.py). La chiave è il concorso e non la data: in dati.txt ci sono
+concorsi diversi con la stessa data (3073 e 3082, entrambi 08/04/2024), che
+con la data come chiave verrebbero fusi in silenzio. INSERT OR IGNORE salta
+quindi i concorsi già presenti; data e maschera sono indicizzate.
+
+Il database usa il journal WAL: le letture della dashboard non bloccano un
+caricamento in corso e viceversa.
+
+Uso:
+    python3 carica_estrazioni.py dat/dati.txt --sqlite estrazioni.db
+    DB_BACKEND=sqlite gunicorn app:server
+"""
+import os
+import sqlite3
+
+import storico
+
+FILE_DB = os.getenv("LOTOF_SQLITE", "./estrazioni.db")
+
+COLONNE_NUMERI = ", ".join(f"n{i}" for i in range(1, 16))
+
+SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS estrazioni_reali (
+        concorso INTEGER NOT NULL PRIMARY KEY,
+        data TEXT NOT NULL,
+        {", ".join(f"n{i} INTEGER NOT NULL" for i in range(1, 16))},
+        maschera INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_estrazioni_reali_data ON estrazioni_reali (data);
+    CREATE INDEX IF NOT EXISTS idx_estrazioni_reali_maschera ON estrazioni_reali (maschera);
+"""
+
+INSERT_ESTRAZIONE = f"""
+    INSERT OR IGNORE INTO estrazioni_reali (concorso, data, {COLONNE_NUMERI}, maschera)
+    VALUES ({", ".join("?" * 18)})
+"""
+
+
+def riga(concorso, data, numeri):
+    """Parametri di INSERT_ESTRAZIONE per un'estrazione."""
+    return (int(concorso), data.isoformat(), *(int(n) for n in numeri), storico.numeri_a_maschera(numeri))
+
+
+def connetti(percorso=FILE_DB):
+    """Apre il database (creandolo se serve) in modalità WAL con lo schema pronto."""
+    conn = sqlite3.connect(percorso, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    conn.commit()
+    return conn
+
+
+def prepara(percorso=FILE_DB):
+    """Crea schema e WAL (la modalità WAL resta salvata nel file) e restituisce il percorso assoluto."""
+    connetti(percorso).close()
+    return os.path.abspath(percorso)
+
+
+def url(percorso=FILE_DB):
+    """URL SQLAlchemy del database locale, già preparato."""
+    return f"sqlite:///{prepara(percorso)}"
@@ -1,53 +1,41 @@
-import random
-from collections import Counter
 import os
 import argparse
 import math
 import numpy as np
 from itertools import combinations
 
+import cache_modelli
+import matrice_storico
+import montecarlo
+
 
 def leggi_file(nome_file):
     """
-    Legge il file e restituisce una lista di liste da 15 numeri (una per ogni estrazione).
+    Restituisce lo storico come matrice uint8 N x 15 in memory map (una riga per
+    estrazione, numeri da 1 a 25): vedi matrice_storico.py.
     """
-    estrazioni = []
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            if len(dati) < 17:
-                continue  # Salta righe malformate
-
-            try:
-                numeri = list(map(int, dati[2:17]))  # Prendi solo i 15 numeri
-                if len(numeri) == 15:
-                    estrazioni.append(numeri)
-            except ValueError:
-                print(f"Errore di conversione nei numeri: {linea.strip()}")
-
-    return estrazioni
+        return np.zeros((0, 15), dtype=np.uint8)
+    return matrice_storico.carica_matrice(nome_file)
 
 
+@cache_modelli.memorizza
 def calcola_probabilita_combinatoria(estrazioni):
     """
     Calcola la probabilità combinatoria per ogni numero nei 15.
     """
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
     return {num: spazio_probabilistico[num] / totale for num in spazio_probabilistico}
 
 
+@cache_modelli.memorizza
 def modello_bayesiano(estrazioni, alpha):
     """
     Calcola la probabilità Bayesiana per ogni numero nei 15.
     """
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
     num_unici = len(spazio_probabilistico)
 
@@ -57,23 +45,18 @@ def modello_bayesiano(estrazioni, alpha):
     }
 
 
+@cache_modelli.memorizza(dipende_da=montecarlo.seme)
 def genera_probabilita_monte_carlo(estrazioni, n_simulazioni=100000):
     """
     Usa simulazioni Monte Carlo per stimare le probabilità dei singoli numeri.
     """
-    conteggi = Counter()
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
 
     chiavi = list(spazio_probabilistico.keys())
     pesi = [spazio_probabilistico[num] / totale for num in chiavi]
 
-    for _ in range(n_simulazioni):
-        estrazione = random.choices(chiavi, weights=pesi, k=25)
-        conteggi.update(estrazione)
-
-    return {num: conteggi[num] / (n_simulazioni * 25) for num in conteggi}
+    return montecarlo.probabilita_monte_carlo(chiavi, pesi, n_simulazioni, k=25)
 
 
 def normalizza_probabilita(prob_dict):
@@ -123,10 +106,12 @@ def main():
     parser.add_argument("n_simulazioni", type=int, help="Numero di simulazioni Monte Carlo.")
     parser.add_argument("--alpha", type=float, default=1, help="Alpha per Bayes (default: 1)")
     parser.add_argument("--top", type=int, default=15, help="Quanti numeri mostrare (default: 15)")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     estrazioni = leggi_file(args.nome_file)
-    if not estrazioni:
+    if len(estrazioni) == 0:
         print("Nessuna estrazione valida trovata.")
         return
 
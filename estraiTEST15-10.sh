@@ -1,11 +1,12 @@
-import random
-from collections import Counter
 import os
 import argparse
 import math
 import numpy as np
 from datetime import datetime
 
+import matrice_storico
+import montecarlo
+
 def get_timestamp():
     """
     Restituisce un timestamp con il formato YYYYMMDD_HHMMSS.
@@ -14,34 +15,19 @@ def get_timestamp():
 
 def leggi_file(nome_file):
     """
-    Legge il file di input e restituisce una lista di tuple di 15 numeri.
-    Il file deve avere, per ogni riga, una data (ignorata) seguita da 15 numeri.
+    Restituisce lo storico come matrice uint8 N x 15 in memory map (una riga per
+    estrazione, numeri da 1 a 25): vedi matrice_storico.py.
     """
-    estrazioni = []
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            try:
-                # La data nella prima colonna viene ignorata
-                numeri = list(map(int, dati[2:]))  # Considera i numeri dal 3° al 17°
-                if len(numeri) == 15:
-                    estrazioni.append(tuple(numeri))
-                else:
-                    print(f"Linea ignorata per formato non valido: {linea.strip()}")
-            except ValueError:
-                print(f"Errore di conversione nei numeri: {linea.strip()}")
-    return estrazioni
+        return np.zeros((0, 15), dtype=np.uint8)
+    return matrice_storico.carica_matrice(nome_file)
 
 def calcola_probabilita_combinatoria(estrazioni):
     """
     Calcola le probabilità combinatorie per ogni numero estratto.
     """
-    tutti_numeri = [numero for estrazione in estrazioni for numero in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
 
     totale = sum(spazio_probabilistico.values())
     probabilita_numeri = {num: spazio_probabilistico[num] / totale for num in spazio_probabilistico}
@@ -52,8 +38,7 @@ def modello_bayesiano(estrazioni, alpha):
     """
     Applica un modello Bayesiano con smoothing per stimare le probabilità dei numeri.
     """
-    tutti_numeri = [numero for estrazione in estrazioni for numero in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
     num_unici = len(spazio_probabilistico)
 
@@ -63,25 +48,22 @@ def modello_bayesiano(estrazioni, alpha):
 
     return probabilita_posteriori
 
-def genera_numeri_aleatori(estrazioni, n_simulazioni=100000):
+def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, top_n=15):
     """
     Genera simulazioni di estrazioni casuali per calcolare le probabilità dei numeri tramite Monte Carlo.
+    Restituisce le frequenze (conteggio / simulazioni) delle top_n combinazioni simulate più frequenti.
     """
-    conteggi = Counter()
-    tutti_numeri = [numero for estrazione in estrazioni for numero in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
     probabilita = {num: spazio_probabilistico[num] / totale for num in spazio_probabilistico}
 
-    chiavi = list(probabilita.keys())
-    pesi = list(probabilita.values())
+    chiavi = sorted(probabilita)
+    pesi = [probabilita[num] for num in chiavi]
 
-    for _ in range(n_simulazioni):
-        estrazione = random.choices(chiavi, weights=pesi, k=15)
-        conteggi[tuple(sorted(estrazione))] += 1
+    # 15 numeri distinti per estrazione, contati per rango della combinazione
+    conteggi = montecarlo.conta_combinazioni(chiavi, pesi, n_simulazioni, k=15)
 
-    probabilita_numeri = {cinquina: conteggio / n_simulazioni for cinquina, conteggio in conteggi.items()}
-    return probabilita_numeri
+    return conteggi.probabilita(top=top_n)
 
 def normalizza_probabilita(prob_dict):
     """
@@ -98,7 +80,8 @@ def modello_ensemble(estrazioni, alpha, n_simulazioni):
     """
     p_comb = normalizza_probabilita(calcola_probabilita_combinatoria(estrazioni))
     p_bayes = normalizza_probabilita(modello_bayesiano(estrazioni, alpha))
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(estrazioni, n_simulazioni))
+    # Già divise per il numero di simulazioni: normalizzarle su un sottoinsieme le gonfierebbe
+    p_mc = genera_numeri_aleatori(estrazioni, n_simulazioni)
 
     tutte_cinquine = set(p_comb.keys()) | set(p_bayes.keys()) | set(p_mc.keys())
     ensemble = {}
@@ -143,7 +126,9 @@ def main():
     parser.add_argument("nome_file", type=str, help="Il nome del file contenente le estrazioni.")
     parser.add_argument("n_simulazioni", type=int, help="Numero di simulazioni Monte Carlo da eseguire.")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
@@ -151,17 +136,17 @@ def main():
 
     # Leggere i dati dal file di input
     estrazioni = leggi_file(nome_file)
-    if not estrazioni:
+    if len(estrazioni) == 0:
         print("Nessuna estrazione valida trovata nel file.")
         return
 
     # Calcolo delle probabilità con i metodi
     p_comb = normalizza_probabilita(calcola_probabilita_combinatoria(estrazioni))
     p_bayes = normalizza_probabilita(modello_bayesiano(estrazioni, alpha))
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(estrazioni, n_simulazioni))
+    p_mc = genera_numeri_aleatori(estrazioni, n_simulazioni)
     
-    # Calcolo dell'ensemble
-    p_ensemble = normalizza_probabilita(modello_ensemble(estrazioni, alpha, n_simulazioni))
+    # Calcolo dell'ensemble (somma già 1 sull'intero spazio)
+    p_ensemble = modello_ensemble(estrazioni, alpha, n_simulazioni)
 
     # Stampa e salva i risultati
     salva_probabilita_su_file(f"probabilita_combinatorio_{timestamp}.txt", p_comb, "Metodo Combinatorio")
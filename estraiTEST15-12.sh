@@ -1,30 +1,22 @@
-import random
 import math
 import os
 from collections import Counter
 import argparse
 import numpy as np
 
+import matrice_storico
+import montecarlo
+
 # Funzione per leggere il file di input
 def leggi_file(nome_file):
-    cinquine = []
+    """
+    Restituisce le estrazioni come lista di tuple di 15 numeri in ordine
+    crescente, lette tramite matrice_storico.py (parser e cache di storico.py).
+    """
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return cinquine
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            try:
-                # La data nella prima colonna viene ignorata
-                numeri = list(map(int, dati[2:]))  # I numeri sono dalla terza colonna in poi
-                if len(numeri) == 15:
-                    cinquine.append(tuple(numeri))
-                else:
-                    print(f"Linea ignorata per formato non valido: {linea.strip()}")
-            except ValueError:
-                print(f"Errore di conversione nei numeri: {linea.strip()}")
-    return cinquine
+        return []
+    return matrice_storico.come_tuple(matrice_storico.carica_matrice(nome_file))
 
 # Metodo combinatorio per calcolare le probabilità
 def calcola_probabilita_combinatoria(cinquine):
@@ -53,20 +45,17 @@ def modello_bayesiano(cinquine, alpha):
         probabilita_cinquine[cinquina] = p
     return probabilita_cinquine
 
-# Metodo Monte Carlo per calcolare le probabilità
-def genera_numeri_aleatori(cinquine, n_simulazioni=100000):
-    conteggi = Counter()
+# Metodo Monte Carlo: frequenze delle cinquine osservate e delle top_n simulate
+def genera_numeri_aleatori(cinquine, n_simulazioni=100000, top_n=15):
     tutti_numeri = [numero for cinquina in cinquine for numero in cinquina]
     spazio_probabilistico = Counter(tutti_numeri)
     totale = sum(spazio_probabilistico.values())
     probabilita = {num: spazio_probabilistico[num] / totale for num in spazio_probabilistico}
-    chiavi = list(probabilita.keys())
-    pesi = list(probabilita.values())
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(random.choices(chiavi, weights=pesi, k=15)))  # Estrazione di 15 numeri
-        conteggi[estrazione] += 1
-    probabilita_cinquine = {cinquina: conteggio / n_simulazioni for cinquina, conteggio in conteggi.items()}
-    return probabilita_cinquine
+    chiavi = sorted(probabilita)
+    pesi = [probabilita[num] for num in chiavi]
+    # 15 numeri distinti per estrazione, contati per rango della combinazione
+    conteggi = montecarlo.conta_combinazioni(chiavi, pesi, n_simulazioni, k=15)
+    return conteggi.probabilita(cinquine, top_n)
 
 # Normalizzazione delle probabilità
 def normalizza_probabilita(prob_dict):
@@ -76,10 +65,11 @@ def normalizza_probabilita(prob_dict):
     return {k: v / totale for k, v in prob_dict.items()}
 
 # Metodo Ensemble che combina tutti i metodi
-def modello_ensemble(cinquine, alpha, n_simulazioni):
+def modello_ensemble(cinquine, alpha, n_simulazioni, top_n=15):
     p_comb = normalizza_probabilita(calcola_probabilita_combinatoria(cinquine))
     p_bayes = normalizza_probabilita(modello_bayesiano(cinquine, alpha))
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(cinquine, n_simulazioni))
+    # Già divise per il numero di simulazioni: normalizzarle su un sottoinsieme le gonfierebbe
+    p_mc = genera_numeri_aleatori(cinquine, n_simulazioni, top_n)
     tutte_cinquine = set(p_comb.keys()) | set(p_bayes.keys()) | set(p_mc.keys())
     ensemble = {}
     for cinquina in tutte_cinquine:
@@ -114,7 +104,9 @@ def main():
     parser.add_argument("n_simulazioni", type=int, help="Numero di simulazioni Monte Carlo da eseguire.")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
     parser.add_argument("--top", type=int, default=15, help="Numero di risultati da visualizzare per ciascun metodo")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
@@ -130,7 +122,7 @@ def main():
     # Calcola i risultati per ogni metodo
     p_comb = normalizza_probabilita(calcola_probabilita_combinatoria(cinquine))
     p_bayes = normalizza_probabilita(modello_bayesiano(cinquine, alpha))
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(cinquine, n_simulazioni))
+    p_mc = genera_numeri_aleatori(cinquine, n_simulazioni, top_n)
 
     # Stampa i risultati per ogni metodo
     stampa_top(p_comb, top_n, "Probabilità Combinatorie:")
@@ -138,7 +130,7 @@ def main():
     stampa_top(p_mc, top_n, "Probabilità Monte Carlo:")
 
     # Calcola il modello Ensemble
-    p_ensemble = modello_ensemble(cinquine, alpha, n_simulazioni)
+    p_ensemble = modello_ensemble(cinquine, alpha, n_simulazioni, top_n)
 
     # Stampa il risultato dell'Ensemble con ordinamento crescente
     stampa_top(p_ensemble, top_n, "Probabilità Ensemble:")
@@ -1,32 +1,21 @@
-import random
 from collections import Counter
 import os
 import argparse
 import math
 import numpy as np
 
+import matrice_storico
+import montecarlo
+
 def leggi_file(nome_file):
     """
-    Legge il file di input e restituisce una lista di tuple con i 15 numeri.
-    Il file deve avere, per ogni riga, una data (ignorata) seguita da 15 numeri.
+    Restituisce le estrazioni come lista di tuple di 15 numeri in ordine
+    crescente, lette tramite matrice_storico.py (parser e cache di storico.py).
     """
-    estrazioni = []
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            try:
-                numeri = list(map(int, dati[2:17]))  # Prende i 15 numeri dalla riga
-                if len(numeri) == 15:
-                    estrazioni.append(tuple(numeri))
-                else:
-                    print(f"Linea ignorata per formato non valido: {linea.strip()}")
-            except ValueError:
-                print(f"Errore di conversione nei numeri: {linea.strip()}")
-    return estrazioni
+        return []
+    return matrice_storico.come_tuple(matrice_storico.carica_matrice(nome_file))
 
 
 def calcola_probabilita_combinatoria(estrazioni):
@@ -68,12 +57,13 @@ def modello_bayesiano(estrazioni, alpha):
     return probabilita_estrazioni
 
 
-def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, smoothing=0.01):
+def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, smoothing=0.01, top_n=15):
     """
     Genera simulazioni di estrazioni casuali per calcolare le probabilità delle estrazioni tramite Monte Carlo,
     con applicazione del smoothing per evitare probabilità estremamente basse.
+    Restituisce le frequenze (conteggio / simulazioni) delle estrazioni osservate e
+    delle top_n combinazioni simulate più frequenti: le altre restano nel contatore.
     """
-    conteggi = Counter()
     tutti_numeri = [numero for estrazione in estrazioni for numero in estrazione]
     spazio_probabilistico = Counter(tutti_numeri)
     totale = sum(spazio_probabilistico.values())
@@ -82,16 +72,14 @@ def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, smoothing=0.01):
     probabilita = {num: (spazio_probabilistico[num] + smoothing) / (totale + smoothing * len(spazio_probabilistico)) 
                    for num in spazio_probabilistico}
 
-    chiavi = list(probabilita.keys())
-    pesi = list(probabilita.values())
+    chiavi = sorted(probabilita)
+    pesi = [probabilita[num] for num in chiavi]
 
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(random.choices(chiavi, weights=pesi, k=15)))
-        conteggi[estrazione] += 1
+    # 15 numeri distinti per estrazione, contati per rango della combinazione
+    conteggi = montecarlo.conta_combinazioni(chiavi, pesi, n_simulazioni, k=15)
 
-    # Converti i conteggi in probabilità stimate
-    probabilita_estrazioni = {estrazione: conteggio / n_simulazioni for estrazione, conteggio in conteggi.items()}
-    return probabilita_estrazioni
+    # Converti i conteggi in probabilità stimate, solo per le combinazioni che servono
+    return conteggi.probabilita(estrazioni, top_n)
 
 
 def normalizza_probabilita(prob_dict):
@@ -104,14 +92,15 @@ def normalizza_probabilita(prob_dict):
     return {k: v / totale for k, v in prob_dict.items()}
 
 
-def modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing):
+def modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing, top_n=15):
     """
     Combina i tre metodi (combinatorio, bayesiano e Monte Carlo) per ottenere una stima ensemble.
     Le probabilità vengono normalizzate e poi combinate mediante media semplice (o pesata).
     """
     p_comb = normalizza_probabilita(calcola_probabilita_combinatoria(estrazioni))
     p_bayes = normalizza_probabilita(modello_bayesiano(estrazioni, alpha))
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(estrazioni, n_simulazioni, smoothing))
+    # Già divise per il numero di simulazioni: normalizzarle su un sottoinsieme le gonfierebbe
+    p_mc = genera_numeri_aleatori(estrazioni, n_simulazioni, smoothing, top_n)
 
     tutte_estrazioni = set(p_comb.keys()) | set(p_bayes.keys()) | set(p_mc.keys())
     ensemble = {}
@@ -144,7 +133,9 @@ def main():
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
     parser.add_argument("--top", type=int, default=1, help="Numero di risultati da visualizzare per ciascun metodo")
     parser.add_argument("--smoothing", type=float, default=0.01, help="Fattore di smoothing per Monte Carlo (default: 0.01)")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
@@ -166,11 +157,12 @@ def main():
     stampa_top(p_bayes, top_n, "La quindicina più probabile (Bayesiano):")
 
     # Simulazioni Monte Carlo con smoothing
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(estrazioni, n_simulazioni, smoothing))
+    p_mc = genera_numeri_aleatori(estrazioni, n_simulazioni, smoothing, top_n)
     stampa_top(p_mc, top_n, "La quindicina più probabile (Monte Carlo):")
 
     # Ensemble dei metodi
-    p_ensemble = normalizza_probabilita(modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing))
+    # Somma già 1 sull'intero spazio: le combinazioni non calcolate non entrano nei primi posti
+    p_ensemble = modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing, max(top_n, 15))
     stampa_top(p_ensemble, top_n, "La quindicina più probabile (Ensemble):")
 
     # Stampa dei 15 numeri con probabilità più alta (Ensemble)
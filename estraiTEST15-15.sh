@@ -1,4 +1,3 @@
-import random
 from collections import Counter
 import os
 import argparse
@@ -6,29 +5,18 @@ import math
 import numpy as np
 import time  # Aggiungi questa importazione per usare time.time()
 
+import matrice_storico
+import montecarlo
+
 def leggi_file(nome_file):
     """
-    Legge il file di input e restituisce una lista di tuple a 15 numeri.
-    Il file deve avere, per ogni riga, una data (ignorata) seguita da 15 numeri.
+    Restituisce le estrazioni come lista di tuple di 15 numeri in ordine
+    crescente, lette tramite matrice_storico.py (parser e cache di storico.py).
     """
-    estrazioni = []
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            try:
-                # La data nella prima colonna viene ignorata
-                numeri = list(map(int, dati[2:]))  # Prendi i numeri da 1 a 15
-                if len(numeri) == 15:
-                    estrazioni.append(tuple(numeri))
-                else:
-                    print(f"Linea ignorata per formato non valido: {linea.strip()}")
-            except ValueError:
-                print(f"Errore di conversione nei numeri: {linea.strip()}")
-    return estrazioni
+        return []
+    return matrice_storico.come_tuple(matrice_storico.carica_matrice(nome_file))
 
 
 def calcola_probabilita_combinatoria(estrazioni):
@@ -70,12 +58,13 @@ def modello_bayesiano(estrazioni, alpha):
     return probabilita_estrazioni
 
 
-def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, smoothing=0.01):
+def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, smoothing=0.01, top_n=15):
     """
     Genera simulazioni di estrazioni casuali per calcolare le probabilità delle estrazioni tramite Monte Carlo,
     con applicazione del smoothing per evitare probabilità estremamente basse.
+    Restituisce le frequenze (conteggio / simulazioni) delle estrazioni osservate e
+    delle top_n combinazioni simulate più frequenti: le altre restano nel contatore.
     """
-    conteggi = Counter()
     tutti_numeri = [numero for estrazione in estrazioni for numero in estrazione]
     spazio_probabilistico = Counter(tutti_numeri)
     totale = sum(spazio_probabilistico.values())
@@ -84,16 +73,14 @@ def genera_numeri_aleatori(estrazioni, n_simulazioni=100000, smoothing=0.01):
     probabilita = {num: (spazio_probabilistico[num] + smoothing) / (totale + smoothing * len(spazio_probabilistico)) 
                    for num in spazio_probabilistico}
 
-    chiavi = list(probabilita.keys())
-    pesi = list(probabilita.values())
+    chiavi = sorted(probabilita)
+    pesi = [probabilita[num] for num in chiavi]
 
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(random.choices(chiavi, weights=pesi, k=15)))  # Cambia k da 5 a 15
-        conteggi[estrazione] += 1
+    # 15 numeri distinti per estrazione, contati per rango della combinazione
+    conteggi = montecarlo.conta_combinazioni(chiavi, pesi, n_simulazioni, k=15)
 
-    # Converti i conteggi in probabilità stimate
-    probabilita_estrazioni = {estrazione: conteggio / n_simulazioni for estrazione, conteggio in conteggi.items()}
-    return probabilita_estrazioni
+    # Converti i conteggi in probabilità stimate, solo per le combinazioni che servono
+    return conteggi.probabilita(estrazioni, top_n)
 
 
 def normalizza_probabilita(prob_dict):
@@ -106,14 +93,15 @@ def normalizza_probabilita(prob_dict):
     return {k: v / totale for k, v in prob_dict.items()}
 
 
-def modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing):
+def modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing, top_n=15):
     """
     Combina i tre metodi (combinatorio, bayesiano e Monte Carlo) per ottenere una stima ensemble.
     Le probabilità vengono normalizzate e poi combinate mediante media semplice (o pesata).
     """
     p_comb = normalizza_probabilita(calcola_probabilita_combinatoria(estrazioni))
     p_bayes = normalizza_probabilita(modello_bayesiano(estrazioni, alpha))
-    p_mc = normalizza_probabilita(genera_numeri_aleatori(estrazioni, n_simulazioni, smoothing))
+    # Già divise per il numero di simulazioni: normalizzarle su un sottoinsieme le gonfierebbe
+    p_mc = genera_numeri_aleatori(estrazioni, n_simulazioni, smoothing, top_n)
 
     tutte_estrazioni = set(p_comb.keys()) | set(p_bayes.keys()) | set(p_mc.keys())
     ensemble = {}
@@ -157,7 +145,9 @@ def main():
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
     parser.add_argument("--smoothing", type=float, default=0.01, help="Parametro di smoothing per Monte Carlo (default: 0.01)")
     parser.add_argument("--top", type=int, default=15, help="Numero di risultati da visualizzare per ciascun metodo")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
@@ -171,7 +161,8 @@ def main():
         return
 
     # Calcolare le probabilità con il metodo Ensemble
-    p_ensemble = normalizza_probabilita(modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing))
+    # Somma già 1 sull'intero spazio: le combinazioni non calcolate non entrano nei primi posti
+    p_ensemble = modello_ensemble(estrazioni, alpha, n_simulazioni, smoothing, max(top_n, 15))
 
     # Mostrare i primi 15 numeri con probabilità più alta (ensemble)
     stampa_top(p_ensemble, top_n, "Top 15 estrazioni con probabilità più alta (Ensemble):")
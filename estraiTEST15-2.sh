@@ -1,56 +1,41 @@
-import random
-from collections import Counter
 import os
 import argparse
 import math
 import numpy as np
 
+import cache_modelli
+import matrice_storico
+import montecarlo
+
 def leggi_file(nome_file):
     """
-    Legge il file e restituisce una lista di liste da 15 numeri (una per ogni estrazione).
-    Considera solo i numeri tra 1 e 25.
+    Restituisce lo storico come matrice uint8 N x 15 in memory map (una riga per
+    estrazione, numeri da 1 a 25): vedi matrice_storico.py.
     """
-    estrazioni = []
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            if len(dati) < 17:
-                continue  # Salta righe malformate
-
-            try:
-                numeri = list(map(int, dati[2:17]))  # Prendi solo i 15 numeri
-                # Considera solo numeri tra 1 e 25
-                numeri = [num for num in numeri if 1 <= num <= 25]
-                if len(numeri) == 15:
-                    estrazioni.append(numeri)
-            except ValueError:
-                print(f"Errore di conversione nei numeri: {linea.strip()}")
-
-    return estrazioni
+        return np.zeros((0, 15), dtype=np.uint8)
+    return matrice_storico.carica_matrice(nome_file)
 
+@cache_modelli.memorizza
 def calcola_probabilita_combinatoria(estrazioni):
     """
     Calcola la probabilità combinatoria per ogni numero tra 1 e 25.
     Considera solo i numeri presenti nelle estrazioni.
     """
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
 
     # Considera solo i numeri da 1 a 25
     return {num: spazio_probabilistico.get(num, 0) / totale for num in range(1, 26)}
 
+@cache_modelli.memorizza
 def modello_bayesiano(estrazioni, alpha):
     """
     Calcola la probabilità Bayesiana per ogni numero tra 1 e 25.
     Considera solo i numeri presenti nelle estrazioni.
     """
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
     num_unici = len(spazio_probabilistico)
 
@@ -60,25 +45,22 @@ def modello_bayesiano(estrazioni, alpha):
         for num in range(1, 26)
     }
 
+@cache_modelli.memorizza(dipende_da=montecarlo.seme)
 def genera_probabilita_monte_carlo(estrazioni, n_simulazioni=100000):
     """
     Usa simulazioni Monte Carlo per stimare le probabilità dei singoli numeri tra 1 e 25.
     Considera solo i numeri presenti nelle estrazioni.
     """
-    conteggi = Counter()
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_probabilistico = Counter(tutti_numeri)
+    spazio_probabilistico = matrice_storico.conteggi(estrazioni)
     totale = sum(spazio_probabilistico.values())
 
     chiavi = list(spazio_probabilistico.keys())
     pesi = [spazio_probabilistico[num] / totale for num in chiavi]
 
-    for _ in range(n_simulazioni):
-        estrazione = random.choices(chiavi, weights=pesi, k=15)
-        conteggi.update(estrazione)
+    p_mc = montecarlo.probabilita_monte_carlo(chiavi, pesi, n_simulazioni, k=15)
 
     # Considera solo i numeri da 1 a 25
-    return {num: conteggi.get(num, 0) / (n_simulazioni * 15) for num in range(1, 26)}
+    return {num: p_mc.get(num, 0) for num in range(1, 26)}
 
 def normalizza_probabilita(prob_dict):
     """
@@ -125,10 +107,12 @@ def main():
     parser.add_argument("n_simulazioni", type=int, help="Numero di simulazioni Monte Carlo.")
     parser.add_argument("--alpha", type=float, default=1, help="Alpha per Bayes (default: 1)")
     parser.add_argument("--top", type=int, default=15, help="Quanti numeri mostrare (default: 15)")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     estrazioni = leggi_file(args.nome_file)
-    if not estrazioni:
+    if len(estrazioni) == 0:
         print("Nessuna estrazione valida trovata.")
         return
 
@@ -1,56 +1,38 @@
-import random
-from collections import Counter
 import os
 import argparse
+import numpy as np
+
+import matrice_storico
+import montecarlo
 
 def leggi_file(nome_file):
-    estrazioni = []
+    """
+    Restituisce lo storico come matrice uint8 N x 15 in memory map (una riga per
+    estrazione, numeri da 1 a 25): vedi matrice_storico.py.
+    """
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            if len(dati) < 17:
-                continue
-            try:
-                numeri = list(map(int, dati[2:17]))
-                # Consideriamo solo numeri da 1 a 25
-                numeri = [n for n in numeri if 1 <= n <= 25]
-                if len(numeri) == 15:
-                    estrazioni.append(numeri)
-            except ValueError:
-                continue
-    return estrazioni
+        return np.zeros((0, 15), dtype=np.uint8)
+    return matrice_storico.carica_matrice(nome_file)
 
 def calcola_probabilita_combinatoria(estrazioni):
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    totale = len(tutti_numeri)
-    conteggio = Counter(tutti_numeri)
+    conteggio = matrice_storico.conteggi(estrazioni)
+    totale = sum(conteggio.values())
     return {n: conteggio.get(n, 0) / totale for n in range(1, 26)}
 
 def modello_bayesiano(estrazioni, alpha=1):
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    conteggio = Counter(tutti_numeri)
+    conteggio = matrice_storico.conteggi(estrazioni)
     totale = sum(conteggio.values())
     k = 25  # numeri da 1 a 25
     return {n: (conteggio.get(n, 0) + alpha) / (totale + alpha * k) for n in range(1, 26)}
 
 def monte_carlo(estrazioni, n_simulazioni=100000):
     # Costruisce la distribuzione empirica da estrazioni reali
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    conteggio = Counter(tutti_numeri)
+    conteggio = matrice_storico.conteggi(estrazioni)
     totale = sum(conteggio.values())
     pesi = [conteggio.get(n, 0) / totale for n in range(1, 26)]
 
-    risultati = Counter()
-    for _ in range(n_simulazioni):
-        campione = random.choices(range(1, 26), weights=pesi, k=15)
-        risultati.update(campione)
-
-    totale_sim = n_simulazioni * 15
-    return {n: risultati.get(n, 0) / totale_sim for n in range(1, 26)}
+    return montecarlo.probabilita_monte_carlo(range(1, 26), pesi, n_simulazioni, k=15)
 
 def stampa_top_15(prob_dict, titolo=""):
     # Prende i 15 con la probabilità più alta, poi li ordina numericamente
@@ -64,10 +46,12 @@ def main():
     parser.add_argument("file", type=str, help="File contenente estrazioni (15 numeri da 1 a 25 per riga)")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano")
     parser.add_argument("--simulazioni", type=int, default=100000, help="Numero di simulazioni per Monte Carlo")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     estrazioni = leggi_file(args.file)
-    if not estrazioni:
+    if len(estrazioni) == 0:
         print("Nessuna estrazione valida trovata.")
         return
 
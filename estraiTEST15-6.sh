@@ -6,60 +6,46 @@ Alla fine, stampa:
 Quante volte 5, 6, 7...15 numeri dei top 15 sono apparsi in ciascuna estrazione
 Una tabella riassuntiva della distribuzione delle intersezioni
 """
-import random
 from collections import Counter
 import os
 import argparse
 import math
 
+import numpy as np
+
+import montecarlo
+import storico
+
 def leggi_file(nome_file):
-    estrazioni = []
     if not os.path.exists(nome_file):
         print(f"Errore: il file '{nome_file}' non esiste.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            try:
-                numeri = list(map(int, dati[2:]))
-                if len(numeri) == 15:
-                    estrazioni.append(tuple(numeri))
-                else:
-                    print(f"Linea ignorata (non ha 15 numeri): {linea.strip()}")
-            except ValueError:
-                print(f"Errore nei dati: {linea.strip()}")
-    return estrazioni
+        return np.zeros(0, dtype=np.uint32)
+    return storico.carica_storico(nome_file).maschere
+
+def conta_numeri(estrazioni):
+    conteggi = storico.frequenze(estrazioni)
+    return Counter({n: int(c) for n, c in enumerate(conteggi, start=1) if c})
 
 def calcola_probabilita_combinatoria(estrazioni):
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    conteggio = Counter(tutti_numeri)
+    conteggio = conta_numeri(estrazioni)
     totale = sum(conteggio.values())
     return {n: conteggio[n] / totale for n in range(1, 26)}
 
 def modello_bayesiano(estrazioni, alpha):
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    conteggio = Counter(tutti_numeri)
+    conteggio = conta_numeri(estrazioni)
     totale = sum(conteggio.values())
     k = 25
     return {n: (conteggio.get(n, 0) + alpha) / (totale + alpha * k) for n in range(1, 26)}
 
 def genera_probabilita_monte_carlo(estrazioni, n_simulazioni):
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    spazio_prob = Counter(tutti_numeri)
+    spazio_prob = conta_numeri(estrazioni)
     totale = sum(spazio_prob.values())
     probabilita = {n: spazio_prob.get(n, 0) / totale for n in range(1, 26)}
 
     chiavi = list(probabilita.keys())
     pesi = list(probabilita.values())
-    conteggi = Counter()
-
-    for _ in range(n_simulazioni):
-        estrazione = random.choices(chiavi, weights=pesi, k=15)
-        for n in estrazione:
-            conteggi[n] += 1
 
-    return {n: conteggi[n] / (n_simulazioni * 15) for n in range(1, 26)}
+    return montecarlo.probabilita_monte_carlo(chiavi, pesi, n_simulazioni, k=15)
 
 def normalizza_probabilita(prob_dict):
     totale = sum(prob_dict.values())
@@ -83,8 +69,7 @@ def stampa_top_15(prob_dict):
     return top_15_sorted
 
 def analizza_top_con_estrazioni(top_numeri, estrazioni):
-    tutti_numeri = [num for estrazione in estrazioni for num in estrazione]
-    conteggio = Counter(tutti_numeri)
+    conteggio = conta_numeri(estrazioni)
     totale = len(estrazioni) * 15
 
     print("\nAnalisi dei numeri Ensemble rispetto alle estrazioni storiche:")
@@ -94,10 +79,8 @@ def analizza_top_con_estrazioni(top_numeri, estrazioni):
         print(f"Numero {numero:2d} - Frequenza: {freq:4d} - Probabilità: {prob:.5f}")
 
 def calcola_intersezioni(top_numeri, estrazioni):
-    distribuzione_intersezioni = Counter()
-    for estrazione in estrazioni:
-        intersezione = len(set(top_numeri) & set(estrazione))
-        distribuzione_intersezioni[intersezione] += 1
+    comuni = storico.intersezioni(estrazioni, storico.numeri_a_maschera(top_numeri))
+    distribuzione_intersezioni = np.bincount(comuni, minlength=16)
 
     print("\nDistribuzione delle intersezioni tra top 15 e ciascuna estrazione:")
     for i in range(0, 16):
@@ -108,10 +91,12 @@ def main():
     parser.add_argument("nome_file", type=str, help="File contenente le estrazioni")
     parser.add_argument("n_simulazioni", type=int, help="Numero simulazioni Monte Carlo")
     parser.add_argument("--alpha", type=float, default=1, help="Alpha smoothing (default=1)")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     estrazioni = leggi_file(args.nome_file)
-    if not estrazioni:
+    if len(estrazioni) == 0:
         print("Nessuna estrazione valida trovata.")
         return
 
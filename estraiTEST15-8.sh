@@ -4,6 +4,11 @@ import os
 import argparse
 import math
 
+import numpy as np
+
+import matrice_storico
+import montecarlo
+
 def genera_serie_casuale():
     return random.sample(range(1, 26), 25)
 
@@ -25,14 +30,8 @@ def genera_probabilita_monte_carlo(numeri, n_simulazioni):
 
     chiavi = list(probabilita.keys())
     pesi = list(probabilita.values())
-    conteggi = Counter()
-
-    for _ in range(n_simulazioni):
-        estrazione = random.choices(chiavi, weights=pesi, k=15)
-        for n in estrazione:
-            conteggi[n] += 1
 
-    return {n: conteggi[n] / (n_simulazioni * 15) for n in range(1, 26)}
+    return montecarlo.probabilita_monte_carlo(chiavi, pesi, n_simulazioni, k=15)
 
 def normalizza_probabilita(prob_dict):
     totale = sum(prob_dict.values())
@@ -45,27 +44,14 @@ def metodo_ensemble(p1, p2, p3):
     return normalizza_probabilita(ensemble)
 
 def leggi_estrazioni(nome_file):
-    estrazioni = []
+    """Storico come matrice uint8 N x 15 in memory map: vedi matrice_storico.py."""
     if not os.path.exists(nome_file):
         print(f"Errore: file '{nome_file}' non trovato.")
-        return estrazioni
-
-    with open(nome_file, 'r', encoding='utf-8') as file:
-        for linea in file:
-            dati = linea.strip().split()
-            try:
-                numeri = list(map(int, dati[2:]))
-                if len(numeri) == 15:
-                    estrazioni.append(numeri)
-            except ValueError:
-                continue
-    return estrazioni
+        return np.zeros((0, 15), dtype=np.uint8)
+    return matrice_storico.carica_matrice(nome_file)
 
 def calcola_frequenza_su_estrazioni(ensemble_prob, estrazioni):
-    conteggio = Counter()
-    for estrazione in estrazioni:
-        for numero in estrazione:
-            conteggio[numero] += 1
+    conteggio = matrice_storico.conteggi(estrazioni)
 
     totale = sum(conteggio.values())
     frequenze = {n: (conteggio[n] / totale if totale > 0 else 0) * ensemble_prob[n] for n in range(1, 26)}
@@ -83,7 +69,9 @@ def main():
     parser.add_argument("nome_file", type=str, help="File con le estrazioni da 15 numeri")
     parser.add_argument("n_simulazioni", type=int, help="Numero di simulazioni per Monte Carlo")
     parser.add_argument("--alpha", type=float, default=1.0, help="Parametro smoothing Bayes (default 1.0)")
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
 
     # 1. Genera numeri casuali da 1 a 25
     numeri_casuali = genera_serie_casuale()
@@ -98,7 +86,7 @@ def main():
 
     # 4. Leggi estrazioni dal file
     estrazioni = leggi_estrazioni(args.nome_file)
-    if not estrazioni:
+    if len(estrazioni) == 0:
         print("Nessuna estrazione valida trovata.")
         return
 
@@ -1,12 +1,13 @@
 #
 #
-import random
 from collections import Counter
 import os
 import argparse
 import math
 import numpy as np
 
+import montecarlo
+
 
 def leggi_file(nome_file):
     """
@@ -82,8 +83,6 @@ def genera_numeri_aleatori(settine, n_simulazioni=100000):
     Genera simulazioni di estrazioni casuali per calcolare le probabilità
     di combinazioni basate su Monte Carlo.
     """
-    conteggi = Counter()
-
     # Estrai tutti i numeri unici dal dataset
     tutti_numeri = [numero for settina in settine for numero in settina]
     spazio_probabilistico = Counter(tutti_numeri)
@@ -92,10 +91,10 @@ def genera_numeri_aleatori(settine, n_simulazioni=100000):
     totale = sum(spazio_probabilistico.values())
     probabilità = {num: spazio_probabilistico[num] / totale for num in spazio_probabilistico}
 
-    # Simula l'estrazione
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(random.choices(list(probabilità.keys()), weights=probabilità.values(), k=15)))
-        conteggi[estrazione] += 1
+    # Simula l'estrazione (15 numeri distinti, pesati per frequenza)
+    numeri_possibili = sorted(probabilità)
+    pesi = [probabilità[num] for num in numeri_possibili]
+    conteggi = montecarlo.conta_combinazioni(numeri_possibili, pesi, n_simulazioni, k=15)
 
     return conteggi
 
@@ -104,18 +103,15 @@ def stampa_top_settine_monte_carlo(conteggi, n_simulazioni, top_n=1):
     """
     Stampa le top N settine più probabili calcolate tramite Monte Carlo.
     """
-    # Calcola le probabilità stimate
-    probabilità_stimate = {
-        tuple(map(int, settina)): conteggio / n_simulazioni
-        for settina, conteggio in conteggi.items()
-    }
-
-    # Ordina le settine in base alla probabilità stimata
-    settine_ordinate = sorted(probabilità_stimate.items(), key=lambda x: x[1], reverse=True)
+    # Le top N settine con la probabilità stimata
+    settine_ordinate = [
+        (tuple(map(int, settina)), conteggio / n_simulazioni)
+        for settina, conteggio in conteggi.most_common(top_n)
+    ]
 
     # Stampa le top N settine
     #print(f"\nLa {top_n} cinquina più probabile secondo il metodo Monte Carlo è:")
-    for settina, prob in settine_ordinate[:top_n]:
+    for settina, prob in settine_ordinate:
         print(f"La cinquina più probabile secondo il metodo Monte Carlo è:  {settina}: {prob:.5f}")
 
 
@@ -127,7 +123,9 @@ def main():
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
 
     # Analizza gli argomenti
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
     alpha = args.alpha
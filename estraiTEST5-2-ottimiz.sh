@@ -1,8 +1,10 @@
-import random
 from collections import Counter
 import os
 import argparse
 import math
+import numpy as np
+
+import montecarlo
 
 
 def leggi_file(nome_file):
@@ -68,22 +70,20 @@ def genera_numeri_aleatori(settine, n_simulazioni=100000):
         print("Errore: non ci sono abbastanza numeri unici per generare combinazioni di 15 numeri senza ripetizioni.")
         return conteggi
 
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(random.sample(tutti_numeri, 15)))
-        conteggi[estrazione] += 1
+    numeri_possibili = sorted(tutti_numeri)
+    pesi = np.ones(len(numeri_possibili))
+    conteggi = montecarlo.conta_combinazioni(numeri_possibili, pesi, n_simulazioni, k=15)
 
     return conteggi
 
 
 def stampa_top_settine_monte_carlo(conteggi, n_simulazioni, top_n=1):
-    probabilità_stimate = {
-        settina: conteggio / n_simulazioni
-        for settina, conteggio in conteggi.items()
-    }
-
-    settine_ordinate = sorted(probabilità_stimate.items(), key=lambda x: x[1], reverse=True)
+    settine_ordinate = [
+        (settina, conteggio / n_simulazioni)
+        for settina, conteggio in conteggi.most_common(top_n)
+    ]
 
-    for settina, prob in settine_ordinate[:top_n]:
+    for settina, prob in settine_ordinate:
         settina_ordinata = tuple(sorted(settina))
         print(f"La cinquina più probabile secondo il metodo Monte Carlo è:  {settina_ordinata}: {prob:.5f}")
 
@@ -94,7 +94,9 @@ def main():
     parser.add_argument("n_simulazioni", type=int, help="Il numero di simulazioni Monte Carlo da eseguire.")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
 
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
     alpha = args.alpha
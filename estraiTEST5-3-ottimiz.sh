@@ -8,6 +8,8 @@ import math
 import numpy as np
 import xgboost as xgb
 
+import montecarlo
+
 
 def leggi_file(nome_file):
     """
@@ -77,36 +79,28 @@ def genera_numeri_aleatori(settine, n_simulazioni=100000):
     Genera simulazioni di estrazioni casuali per calcolare le probabilità
     di combinazioni basate su Monte Carlo senza numeri ripetuti.
     """
-    conteggi = Counter()
-
     tutti_numeri = [numero for settina in settine for numero in settina]
     spazio_probabilistico = Counter(tutti_numeri)
 
     totale = sum(spazio_probabilistico.values())
     probabilità = {num: spazio_probabilistico[num] / totale for num in spazio_probabilistico}
-    numeri_possibili = list(probabilità.keys())
-    pesi = list(probabilità.values())
+    numeri_possibili = sorted(probabilità)
+    pesi = [probabilità[num] for num in numeri_possibili]
 
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(random.choices(numeri_possibili, weights=pesi, k=15)))
-        # elimina ripetizioni se presenti (random.choices può scegliere con ripetizioni)
-        # per estrazioni senza ripetizioni meglio usare random.sample con pesi approssimati:
-        # ma random.sample non supporta pesi nativamente, si usa np.random.choice con replace=False
-        estrazione = tuple(sorted(np.random.choice(numeri_possibili, size=15, replace=False, p=pesi/np.sum(pesi))))
-        conteggi[estrazione] += 1
+    # Estrazioni pesate senza ripetizioni, generate a blocchi (chiavi esponenziali)
+    # e contate per rango della combinazione
+    conteggi = montecarlo.conta_combinazioni(numeri_possibili, pesi, n_simulazioni, k=15)
 
     return conteggi
 
 
 def stampa_top_settine_monte_carlo(conteggi, n_simulazioni, top_n=1):
-    probabilità_stimate = {
-        tuple(map(int, settina)): conteggio / n_simulazioni
-        for settina, conteggio in conteggi.items()
-    }
-
-    settine_ordinate = sorted(probabilità_stimate.items(), key=lambda x: x[1], reverse=True)
+    settine_ordinate = [
+        (tuple(map(int, settina)), conteggio / n_simulazioni)
+        for settina, conteggio in conteggi.most_common(top_n)
+    ]
 
-    for settina, prob in settine_ordinate[:top_n]:
+    for settina, prob in settine_ordinate:
         print(f"Combinazione più probabile:  {settina}: {prob:.5f}")
 
 
@@ -294,7 +288,9 @@ def main():
     parser.add_argument("n_simulazioni", type=int, help="Il numero di simulazioni Monte Carlo da eseguire.")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
 
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
     alpha = args.alpha
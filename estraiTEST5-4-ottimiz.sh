@@ -5,6 +5,8 @@ import argparse
 import math
 import numpy as np
 
+import montecarlo
+
 try:
     import xgboost as xgb
     from sklearn.linear_model import LogisticRegression
@@ -74,24 +76,19 @@ def genera_numeri_aleatori(settine, n_simulazioni=100000):
     """
     Genera simulazioni Monte Carlo basate sulle probabilità dei singoli numeri.
     """
-    conteggi = Counter()
-
     tutti_numeri = [numero for settina in settine for numero in settina]
     spazio_probabilistico = Counter(tutti_numeri)
     totale = sum(spazio_probabilistico.values())
     probabilità = np.array([spazio_probabilistico[num] / totale for num in range(1, 91)])
     numeri_possibili = np.arange(1, 91)
 
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(np.random.choice(numeri_possibili, size=15, replace=False, p=probabilità/probabilità.sum())))
-        conteggi[estrazione] += 1
+    conteggi = montecarlo.conta_combinazioni(numeri_possibili, probabilità, n_simulazioni, k=15)
 
     return conteggi
 
 def stampa_top_settine_monte_carlo(conteggi, n_simulazioni, top_n=1):
-    probabilità_stimate = {settina: conteggio / n_simulazioni for settina, conteggio in conteggi.items()}
-    settine_ordinate = sorted(probabilità_stimate.items(), key=lambda x: x[1], reverse=True)
-    for settina, prob in settine_ordinate[:top_n]:
+    settine_ordinate = [(settina, conteggio / n_simulazioni) for settina, conteggio in conteggi.most_common(top_n)]
+    for settina, prob in settine_ordinate:
         print(f"Combinazione più probabile: {settina} - Probabilità media stimata: {prob:.10f}")
 
 def estrazione_markov_chain(settine):
@@ -241,7 +238,9 @@ def main():
     parser.add_argument("n_simulazioni", type=int, help="Il numero di simulazioni Monte Carlo da eseguire.")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
 
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
     nome_file = args.nome_file
     n_simulazioni = args.n_simulazioni
     alpha = args.alpha
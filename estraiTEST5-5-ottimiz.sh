@@ -3,6 +3,7 @@ from collections import Counter
 import os
 import argparse
 import math
+import uuid
 import numpy as np
 
 try:
@@ -14,6 +15,8 @@ except ImportError:
 
 import mysql.connector
 
+import montecarlo
+
 def connetti_db(host, user, password, database):
     try:
         conn = mysql.connector.connect(
@@ -27,15 +30,72 @@ def connetti_db(host, user, password, database):
         print(f"Errore nella connessione al DB: {err}")
         return None
 
-def salva_estrazione(conn, tipo_modello, settina, probabilita):
+# I numeri vanno da 1 a 90: la combinazione è una maschera a 96 bit (bit n-1
+# acceso se c'è il numero n) salvata in BINARY(12), compatta e indicizzabile.
+BYTE_MASCHERA = 12
+
+# Migrazione una tantum (--prepara_db): il DDL fa un commit implicito in
+# MariaDB e richiede il privilegio ALTER, quindi resta fuori dal salvataggio.
+PREPARA_TABELLA = """
+    ALTER TABLE estrazioni
+    ADD COLUMN IF NOT EXISTS id_run CHAR(32) NULL,
+    ADD COLUMN IF NOT EXISTS maschera BINARY(12) NULL,
+    ADD INDEX IF NOT EXISTS idx_estrazioni_maschera (maschera),
+    ADD INDEX IF NOT EXISTS idx_estrazioni_run (id_run)
+"""
+
+INSERT_ESTRAZIONE = """
+    INSERT INTO estrazioni (id_run, modello, combinazione, maschera, probabilita)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def prepara_tabella(conn):
+    """Aggiunge a estrazioni le colonne id_run e maschera con i loro indici (idempotente)."""
     cur = conn.cursor()
-    prob = float(probabilita)  # Converti a tipo float Python nativo
-    cur.execute("""
-        INSERT INTO estrazioni (modello, combinazione, probabilita)
-        VALUES (%s, %s, %s)
-    """, (tipo_modello, str(settina), prob))
-    conn.commit()
-    cur.close()
+    try:
+        cur.execute(PREPARA_TABELLA)
+    finally:
+        cur.close()
+
+def maschera_combinazione(settina):
+    maschera = 0
+    for numero in settina:
+        maschera |= 1 << (int(numero) - 1)
+    return maschera.to_bytes(BYTE_MASCHERA, 'big')
+
+class SalvataggioEstrazioni:
+    """
+    Accumula i risultati dei modelli di un'esecuzione e li scrive tutti insieme:
+    un solo INSERT multi-riga e un solo commit sulla stessa connessione.
+    La tabella deve essere già stata preparata con --prepara_db.
+    """
+
+    def __init__(self, conn, id_run=None):
+        self.conn = conn
+        self.id_run = id_run or uuid.uuid4().hex
+        self.righe = []
+
+    def aggiungi(self, tipo_modello, settina, probabilita):
+        numeri = tuple(sorted(int(n) for n in settina))
+        combinazione = " ".join(f"{n:02}" for n in numeri)
+        prob = float(probabilita)  # Converti a tipo float Python nativo
+        self.righe.append((self.id_run, tipo_modello, combinazione, maschera_combinazione(numeri), prob))
+
+    def salva(self):
+        if not self.righe:
+            return 0
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(INSERT_ESTRAZIONE, self.righe)
+            self.conn.commit()
+        except mysql.connector.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        salvate = len(self.righe)
+        self.righe = []
+        return salvate
 
 def leggi_file(nome_file):
     settine = []
@@ -87,24 +147,19 @@ def modello_bayesiano(settine, alpha):
     return settine_ordinate
 
 def genera_numeri_aleatori(settine, n_simulazioni=100000):
-    conteggi = Counter()
-
     tutti_numeri = [numero for settina in settine for numero in settina]
     spazio_probabilistico = Counter(tutti_numeri)
     totale = sum(spazio_probabilistico.values())
     probabilità = np.array([spazio_probabilistico[num] / totale for num in range(1, 91)])
     numeri_possibili = np.arange(1, 91)
 
-    for _ in range(n_simulazioni):
-        estrazione = tuple(sorted(np.random.choice(numeri_possibili, size=15, replace=False, p=probabilità/probabilità.sum())))
-        conteggi[estrazione] += 1
+    conteggi = montecarlo.conta_combinazioni(numeri_possibili, probabilità, n_simulazioni, k=15)
 
     return conteggi
 
 def stampa_top_settine_monte_carlo(conteggi, n_simulazioni, top_n=1):
-    probabilità_stimate = {settina: conteggio / n_simulazioni for settina, conteggio in conteggi.items()}
-    settine_ordinate = sorted(probabilità_stimate.items(), key=lambda x: x[1], reverse=True)
-    for settina, prob in settine_ordinate[:top_n]:
+    settine_ordinate = [(settina, conteggio / n_simulazioni) for settina, conteggio in conteggi.most_common(top_n)]
+    for settina, prob in settine_ordinate:
         print(f"Combinazione più probabile: {settina} - Probabilità media stimata: {prob:.10f}")
 
 def estrazione_markov_chain(settine):
@@ -243,15 +298,34 @@ def estrazione_xgboost(settine):
 
 def main():
     parser = argparse.ArgumentParser(description="Analisi di settine con tecniche Monte Carlo, combinatorie e Bayesiane.")
-    parser.add_argument("nome_file", type=str, help="Il nome del file contenente le settine.")
-    parser.add_argument("n_simulazioni", type=int, help="Il numero di simulazioni Monte Carlo da eseguire.")
+    parser.add_argument("nome_file", type=str, nargs='?', help="Il nome del file contenente le settine.")
+    parser.add_argument("n_simulazioni", type=int, nargs='?', help="Il numero di simulazioni Monte Carlo da eseguire.")
     parser.add_argument("--alpha", type=float, default=1, help="Parametro di smoothing per il modello Bayesiano (default: 1)")
     parser.add_argument("--db_host", type=str, default="localhost", help="Host del database MariaDB")
     parser.add_argument("--db_user", type=str, required=True, help="Utente MariaDB")
     parser.add_argument("--db_password", type=str, required=True, help="Password MariaDB")
     parser.add_argument("--db_name", type=str, required=True, help="Nome database MariaDB")
+    parser.add_argument("--prepara_db", action="store_true",
+                        help="Migrazione una tantum: aggiunge id_run, maschera e indici alla tabella estrazioni ed esce")
 
+    montecarlo.aggiungi_opzioni(parser)
     args = parser.parse_args()
+    montecarlo.configura(args.seed, args.workers)
+
+    if args.prepara_db:
+        conn = connetti_db(args.db_host, args.db_user, args.db_password, args.db_name)
+        if conn is None:
+            return
+        try:
+            prepara_tabella(conn)
+            print("Tabella estrazioni pronta (id_run, maschera e indici).")
+        except mysql.connector.Error as err:
+            print(f"Errore nella preparazione della tabella: {err}")
+        finally:
+            conn.close()
+        return
+    if args.nome_file is None or args.n_simulazioni is None:
+        parser.error("nome_file e n_simulazioni sono obbligatori (tranne con --prepara_db)")
 
     settine = leggi_file(args.nome_file)
     if not settine:
@@ -294,16 +368,22 @@ def main():
         print("Connessione al DB fallita, i risultati non saranno salvati.")
         return
 
-    # Salvataggio estrazioni
-    salva_estrazione(conn, "combinatoria", comb_prob[0][0], comb_prob[0][1])
-    salva_estrazione(conn, "bayesiana", bayes_prob[0][0], bayes_prob[0][1])
+    # Salvataggio estrazioni: un'unica transazione per tutti i modelli
+    salvataggio = SalvataggioEstrazioni(conn)
+    salvataggio.aggiungi("combinatoria", comb_prob[0][0], comb_prob[0][1])
+    salvataggio.aggiungi("bayesiana", bayes_prob[0][0], bayes_prob[0][1])
     # Per Monte Carlo possiamo prendere la prima estrazione più probabile
-    top_mc = sorted({k: v for k, v in conteggi.items()}.items(), key=lambda x: x[1], reverse=True)[0]
-    salva_estrazione(conn, "monte_carlo", top_mc[0], top_mc[1]/args.n_simulazioni)
-    salva_estrazione(conn, "markov_chain", estratto_mc, 0)  # Senza probabilità stimata
-    salva_estrazione(conn, "logistic_regression", estratto_lr, prob_lr)
-    salva_estrazione(conn, "random_forest", estratto_rf, prob_rf)
-    salva_estrazione(conn, "xgboost", estratto_xgb, prob_xgb)
+    top_mc = conteggi.most_common(1)[0]
+    salvataggio.aggiungi("monte_carlo", top_mc[0], top_mc[1]/args.n_simulazioni)
+    salvataggio.aggiungi("markov_chain", estratto_mc, 0)  # Senza probabilità stimata
+    salvataggio.aggiungi("logistic_regression", estratto_lr, prob_lr)
+    salvataggio.aggiungi("random_forest", estratto_rf, prob_rf)
+    salvataggio.aggiungi("xgboost", estratto_xgb, prob_xgb)
+    try:
+        salvate = salvataggio.salva()
+        print(f"Salvate {salvate} combinazioni (run {salvataggio.id_run}).")
+    except mysql.connector.Error as err:
+        print(f"Errore nel salvataggio delle estrazioni: {err}")
 
     conn.close()
 
@@ -0,0 +1,107 @@
+"""
+Indice a somme prefisse per le frequenze dei numeri su intervalli di date.
+
+Le estrazioni vengono ordinate per data e si precalcola la matrice cumulativa
+(estrazione x 25 numeri): la riga i contiene quante volte ogni numero è uscito
+nelle prime i estrazioni. Le frequenze su un intervallo di date si ottengono
+con due ricerche binarie sulle date e una sottrazione di due righe, qualunque
+sia la lunghezza dello storico; le maschere a 25 bit delle estrazioni servono
+per le combinazioni più frequenti. Aggregati raccoglie in un'unica struttura
+quanto serve a tutti i grafici per un intervallo e viene calcolato una sola
+volta per (tabella, intervallo).
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+import cache_dati
+import storico
+
+COLONNE_NUMERI = [f"n{i}" for i in range(1, 16)]
+TOP_COMBINAZIONI = 5
+
+
+class IndiceFrequenze:
+    """Date ordinate, matrice cumulativa (N+1) x 25 e maschere delle estrazioni."""
+
+    def __init__(self, df):
+        df = df.sort_values('data', kind='stable')
+        self.date = pd.to_datetime(df['data']).to_numpy(dtype='datetime64[ns]')
+        valori = df[COLONNE_NUMERI].fillna(0).to_numpy(dtype=np.int64, copy=True)
+        valori[(valori < 1) | (valori > storico.NUMERI)] = 0
+
+        presenze = np.zeros((len(valori), storico.NUMERI + 1), dtype=bool)
+        presenze[np.arange(len(valori))[:, None], valori] = True
+        presenze = presenze[:, 1:]  # la colonna 0 raccoglie i valori mancanti
+        self.cumulata = np.zeros((len(valori) + 1, storico.NUMERI), dtype=np.int32)
+        np.cumsum(presenze, axis=0, dtype=np.int32, out=self.cumulata[1:])
+        pesi = np.left_shift(np.uint32(1), np.arange(storico.NUMERI, dtype=np.uint32))
+        self.maschere = (presenze * pesi).sum(axis=1, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.date)
+
+    def intervallo(self, start_date=None, end_date=None):
+        """Estrazioni [inizio, fine) con data compresa tra start_date e end_date (inclusi)."""
+        inizio, fine = 0, len(self)
+        if start_date:
+            inizio = int(np.searchsorted(self.date, pd.Timestamp(start_date).to_datetime64(), side='left'))
+        if end_date:
+            fine = int(np.searchsorted(self.date, pd.Timestamp(end_date).to_datetime64(), side='right'))
+        return inizio, max(inizio, fine)
+
+    def frequenze(self, start_date=None, end_date=None):
+        """Dizionario {numero: uscite} dei numeri usciti nell'intervallo."""
+        inizio, fine = self.intervallo(start_date, end_date)
+        conteggi = self.cumulata[fine] - self.cumulata[inizio]
+        return {num: int(c) for num, c in enumerate(conteggi, start=1) if c}
+
+    def top_combinazioni(self, n=5, start_date=None, end_date=None):
+        """Le n combinazioni più frequenti nell'intervallo come lista di (tupla, conteggio)."""
+        inizio, fine = self.intervallo(start_date, end_date)
+        maschere, conteggi = np.unique(self.maschere[inizio:fine], return_counts=True)
+        ordine = np.argsort(-conteggi, kind='stable')[:n]
+        return [(tuple(storico.maschera_a_numeri(maschere[i])), int(conteggi[i])) for i in ordine]
+
+
+class Aggregati:
+    """
+    Tutto ciò che serve ai grafici della dashboard per un intervallo di date:
+    frequenze dei numeri, combinazioni più frequenti e serie cumulate.
+    """
+
+    def __init__(self, indice, start_date=None, end_date=None, top=TOP_COMBINAZIONI):
+        self.inizio, self.fine = indice.intervallo(start_date, end_date)
+        self.frequenze = indice.frequenze(start_date, end_date)
+        self.top_combinazioni = indice.top_combinazioni(top, start_date, end_date)
+        self.date = indice.date[self.inizio:self.fine]
+        # Uscite cumulate di ogni numero dall'inizio dell'intervallo, una riga per estrazione
+        self.cumulate = indice.cumulata[self.inizio + 1:self.fine + 1] - indice.cumulata[self.inizio]
+
+    def vuoto(self):
+        return self.fine == self.inizio
+
+    def cumulata_numero(self, numero):
+        """DataFrame (data, freq_cum) con le uscite cumulate del numero nell'intervallo."""
+        if self.vuoto() or not 1 <= numero <= storico.NUMERI:
+            return pd.DataFrame()
+        return pd.DataFrame({'data': self.date, 'freq_cum': self.cumulate[:, numero - 1]})
+
+
+@functools.lru_cache(maxsize=4)
+def indice_da_chiave(chiave_dati):
+    """Costruisce (una sola volta per processo) l'indice della tabella salvata in cache_dati."""
+    df = cache_dati.leggi_dataframe(chiave_dati)
+    if df is None or df.empty:
+        return None
+    return IndiceFrequenze(df)
+
+
+@functools.lru_cache(maxsize=32)
+def aggregati(chiave_dati, start_date=None, end_date=None):
+    """Aggregati per (tabella, intervallo di date), calcolati una sola volta e condivisi dai grafici."""
+    indice = indice_da_chiave(chiave_dati)
+    if indice is None:
+        return None
+    return Aggregati(indice, start_date, end_date)
@@ -0,0 +1,149 @@
+"""
+Storico come matrice uint8 (N estrazioni x 15 numeri) in memory map.
+
+Gli script estraiTEST leggevano il file in liste di tuple di int Python
+(decine di byte per numero), ognuno con il proprio parser. Qui la matrice è
+ricavata dallo Storico di storico.py (stesso parser, stessa validazione e
+stessa cache .npz; numeri di ogni riga in ordine crescente) e salvata accanto
+al testo (dat/dati.txt -> dat/dati.txt.u8): un header di 64 byte seguito dalla
+matrice riga per riga, un byte per numero. Il file viene aperto con np.memmap
+in sola lettura, quindi il caricamento è a tempo costante e più esecuzioni in
+parallelo condividono le stesse pagine tramite la page cache.
+
+L'header porta la firma del file di testo (storico.firma_file) e la matrice
+viene rigenerata quando il testo cambia. Un file .u8 può anche essere passato
+direttamente (es. storici sintetici).
+
+Gli script estraiTEST15 leggono lo storico da qui, tranne estraiTEST15-6 (che
+lavora direttamente sulle maschere di storico.py) ed estraiTEST15 (che usa le
+statistiche incrementali di statistiche.py). Gli estraiTEST5-* riguardano
+settine di numeri da 1 a 90 in un altro formato e non usano questo modulo.
+
+Uso da riga di comando:
+    python3 matrice_storico.py dat/dati.txt [uscita.u8]
+"""
+import os
+import struct
+from collections import Counter
+
+import numpy as np
+
+import storico
+
+ESTENSIONE = '.u8'
+
+_MAGIC = b'LOTOU8M2'  # M2: righe ricavate da storico.py, numeri in ordine crescente
+_HEADER = struct.Struct('<8sIQqq')  # magic, colonne, righe, dimensione e mtime del testo
+_DIMENSIONE_HEADER = 64
+
+
+def file_matrice(nome_file):
+    """Percorso della matrice associata al file di testo."""
+    return nome_file if nome_file.endswith(ESTENSIONE) else nome_file + ESTENSIONE
+
+
+def leggi_testo(nome_file):
+    """Matrice uint8 N x 15 dallo Storico del file (dati.txt o registro .log), nell'ordine del file."""
+    maschere = storico.carica_storico(nome_file).maschere
+    if len(maschere) == 0:
+        return np.zeros((0, storico.NUMERI_PER_ESTRAZIONE), dtype=np.uint8)
+    return storico.matrice_numeri(maschere)
+
+
+def come_tuple(matrice):
+    """Lista di tuple di int, per gli script che usano le estrazioni come chiavi di dizionario."""
+    return [tuple(riga) for riga in np.asarray(matrice).tolist()]
+
+
+def salva_matrice(matrice, percorso, dimensione=0, mtime=0):
+    """Scrive header e matrice in modo atomico (file temporaneo + rename)."""
+    matrice = np.ascontiguousarray(matrice, dtype=np.uint8)
+    header = _HEADER.pack(_MAGIC, matrice.shape[1], matrice.shape[0], dimensione, mtime)
+    temporaneo = f"{percorso}.{os.getpid()}.tmp"
+    try:
+        with open(temporaneo, 'wb') as f:
+            f.write(header.ljust(_DIMENSIONE_HEADER, b'\0'))
+            f.write(matrice.tobytes())
+        os.replace(temporaneo, percorso)
+    except OSError as e:
+        print(f"Impossibile salvare la matrice '{percorso}': {e}")
+
+
+def _leggi_header(percorso):
+    """Restituisce (colonne, righe, dimensione, mtime) o None se il file non è una matrice valida."""
+    try:
+        with open(percorso, 'rb') as f:
+            contenuto = f.read(_HEADER.size)
+            f.seek(0, os.SEEK_END)
+            lunghezza = f.tell()
+    except OSError:
+        return None
+    if len(contenuto) < _HEADER.size:
+        return None
+    magic, colonne, righe, dimensione, mtime = _HEADER.unpack(contenuto)
+    if magic != _MAGIC or lunghezza != _DIMENSIONE_HEADER + colonne * righe:
+        return None
+    return colonne, righe, dimensione, mtime
+
+
+def apri_matrice(percorso):
+    """Apre una matrice .u8 in memory map (sola lettura); None se non è valida."""
+    header = _leggi_header(percorso)
+    if header is None:
+        return None
+    colonne, righe = header[:2]
+    if righe == 0:
+        return np.zeros((0, colonne), dtype=np.uint8)
+    return np.memmap(percorso, dtype=np.uint8, mode='r', offset=_DIMENSIONE_HEADER, shape=(righe, colonne))
+
+
+def carica_matrice(nome_file):
+    """
+    Restituisce lo storico come matrice uint8 N x 15 in memory map, nell'ordine
+    delle righe del file. Rigenera il file .u8 se il testo è cambiato.
+    """
+    nome_file = storico.sorgente(nome_file)
+    percorso = file_matrice(nome_file)
+    if percorso == nome_file:
+        matrice = apri_matrice(percorso)
+        return matrice if matrice is not None else np.zeros((0, storico.NUMERI_PER_ESTRAZIONE), dtype=np.uint8)
+
+    firma = tuple(int(v) for v in storico.firma_file(nome_file))
+    header = _leggi_header(percorso)
+    if header is None or header[2:] != firma:
+        salva_matrice(leggi_testo(nome_file), percorso, *firma)
+    matrice = apri_matrice(percorso)
+    if matrice is None:
+        # Matrice non scrivibile: si lavora sulla copia in memoria
+        return leggi_testo(nome_file)
+    return matrice
+
+
+def conteggi(matrice):
+    """Counter {numero: uscite} dei numeri presenti nella matrice, senza espandere i valori in Python."""
+    uscite = np.bincount(np.asarray(matrice, dtype=np.uint8).ravel(), minlength=storico.NUMERI + 1)
+    return Counter({numero: int(n) for numero, n in enumerate(uscite) if n})
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Converte lo storico in una matrice uint8 per np.memmap.")
+    parser.add_argument("nome_file", help="File delle estrazioni (dati.txt o registro .log)")
+    parser.add_argument("uscita", nargs='?', help="File .u8 di destinazione (default: accanto al testo)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.nome_file):
+        print(f"Errore: il file '{args.nome_file}' non esiste.")
+        return
+    if args.uscita:
+        salva_matrice(leggi_testo(args.nome_file), args.uscita, *(int(v) for v in storico.firma_file(args.nome_file)))
+        percorso = args.uscita
+    else:
+        carica_matrice(args.nome_file)
+        percorso = file_matrice(args.nome_file)
+    matrice = apri_matrice(percorso)
+    print(f"Matrice '{percorso}': {matrice.shape[0]} estrazioni x {matrice.shape[1]} numeri.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Motore Monte Carlo vettorizzato per le simulazioni delle estrazioni.
+
+Invece di chiamare random.choices e Counter.update una simulazione alla volta,
+le estrazioni simulate vengono generate a blocchi (matrice blocco x k di indici,
+campionati con il metodo alias) e i conteggi accumulati con np.bincount.
+La memoria resta limitata alla dimensione del blocco qualunque sia il numero
+di simulazioni.
+
+Ogni blocco usa un generatore proprio, derivato con SeedSequence.spawn dal
+seme della simulazione: i blocchi possono quindi essere distribuiti su più
+processi (--workers N) e i conteggi, sommati alla fine, sono identici bit per
+bit a parità di --seed qualunque sia il numero di processi.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import combinazioni
+
+BLOCCO = 65536
+
+_configurazione = {'seed': None, 'workers': 1}
+
+
+def aggiungi_opzioni(parser):
+    """Aggiunge al parser argparse le opzioni --workers e --seed."""
+    parser.add_argument("--workers", type=int, default=1, help="Processi per le simulazioni Monte Carlo (default: 1)")
+    parser.add_argument("--seed", type=int, default=None, help="Seme per simulazioni riproducibili (default: casuale)")
+
+
+def configura(seed=None, workers=1):
+    """Imposta seme e numero di processi usati di default dalle simulazioni."""
+    _configurazione['seed'] = seed
+    _configurazione['workers'] = max(1, int(workers or 1))
+
+
+def seme():
+    """Seme configurato per le simulazioni (None se casuale)."""
+    return _configurazione['seed']
+
+
+def _normalizza_pesi(pesi):
+    pesi = np.asarray(pesi, dtype=np.float64)
+    totale = pesi.sum()
+    if totale <= 0:
+        raise ValueError("La somma dei pesi deve essere positiva.")
+    return pesi / totale
+
+
+def tabella_alias(pesi):
+    """
+    Costruisce la tabella alias di Walker/Vose per campionare in O(1) da una
+    distribuzione discreta: restituisce (soglie, alias).
+    """
+    p = _normalizza_pesi(pesi)
+    n = len(p)
+    soglie = p * n
+    alias = np.arange(n, dtype=np.intp)
+    piccoli = [i for i in range(n) if soglie[i] < 1.0]
+    grandi = [i for i in range(n) if soglie[i] >= 1.0]
+    while piccoli and grandi:
+        s, g = piccoli.pop(), grandi.pop()
+        alias[s] = g
+        soglie[g] -= 1.0 - soglie[s]
+        (piccoli if soglie[g] < 1.0 else grandi).append(g)
+    for i in piccoli + grandi:
+        soglie[i] = 1.0
+    return soglie, alias
+
+
+def _blocchi(n_simulazioni, blocco, seed):
+    """Suddivide le simulazioni in blocchi, ognuno con il proprio SeedSequence figlio."""
+    seed = _configurazione['seed'] if seed is None else seed
+    n_simulazioni = int(n_simulazioni)
+    n_blocchi = math.ceil(n_simulazioni / blocco) if n_simulazioni > 0 else 0
+    figli = np.random.SeedSequence(seed).spawn(n_blocchi)
+    return [
+        (min(blocco, n_simulazioni - i * blocco), figlio)
+        for i, figlio in enumerate(figli)
+    ]
+
+
+def _esegui(funzione, argomenti, blocchi, workers, unisci):
+    """
+    Esegue funzione(*argomenti, blocchi) su uno o più processi, dividendo i
+    blocchi in gruppi contigui, e combina i risultati parziali con unisci.
+    """
+    workers = _configurazione['workers'] if workers is None else max(1, workers)
+    workers = min(workers, len(blocchi))
+    if workers <= 1:
+        return funzione(*argomenti, blocchi)
+
+    dimensione = math.ceil(len(blocchi) / workers)
+    gruppi = [blocchi[i:i + dimensione] for i in range(0, len(blocchi), dimensione)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parziali = list(pool.map(funzione, *[[a] * len(gruppi) for a in argomenti], gruppi))
+    risultato = parziali[0]
+    for parziale in parziali[1:]:
+        risultato = unisci(risultato, parziale)
+    return risultato
+
+
+def _con_reinserimento(pesi, k, blocchi):
+    soglie, alias = tabella_alias(pesi)
+    n = len(soglie)
+    for b, figlio in blocchi:
+        rng = np.random.default_rng(figlio)
+        # Un solo uniforme per elemento: parte intera = colonna, parte frazionaria = soglia
+        x = rng.random((b, k))
+        x *= n
+        colonne = x.astype(np.intp)
+        x -= colonne
+        yield np.where(x < soglie[colonne], colonne, alias[colonne])
+
+
+def _senza_reinserimento(pesi, k, blocchi):
+    p = _normalizza_pesi(pesi)
+    if np.count_nonzero(p) < k:
+        raise ValueError(f"Servono almeno {k} elementi con peso positivo per estrarre senza ripetizioni.")
+    # Gli elementi a peso nullo non possono uscire: si lavora solo su quelli attivi
+    attivi = np.flatnonzero(p > 0)
+    inversi = 1.0 / p[attivi]
+    for b, figlio in blocchi:
+        rng = np.random.default_rng(figlio)
+        chiavi = rng.standard_exponential((b, len(attivi)))
+        chiavi *= inversi
+        scelti = np.argpartition(chiavi, k - 1, axis=1)[:, :k]
+        scelti.sort(axis=1)
+        yield attivi[scelti]
+
+
+def estrazioni_simulate(pesi, n_simulazioni, k=15, blocco=BLOCCO, seed=None):
+    """
+    Genera a blocchi le estrazioni simulate (con reinserimento, come random.choices).
+    Ogni blocco è una matrice (b, k) di indici nell'array dei pesi.
+    """
+    return _con_reinserimento(pesi, k, _blocchi(n_simulazioni, blocco, seed))
+
+
+def estrazioni_senza_reinserimento(pesi, n_simulazioni, k=15, blocco=BLOCCO, seed=None):
+    """
+    Genera a blocchi estrazioni pesate di k elementi distinti, con la stessa
+    distribuzione di np.random.choice(..., replace=False, p=pesi): per ogni
+    simulazione si estrae una chiave esponenziale E/peso per elemento e si
+    tengono i k elementi con chiave minore. Ogni blocco è una matrice (b, k)
+    di indici nell'array dei pesi, ordinati per indice crescente.
+    """
+    return _senza_reinserimento(pesi, k, _blocchi(n_simulazioni, blocco, seed))
+
+
+def _conteggi_shard(pesi, k, blocchi):
+    conteggi = np.zeros(len(pesi), dtype=np.int64)
+    for estrazioni in _con_reinserimento(pesi, k, blocchi):
+        conteggi += np.bincount(estrazioni.ravel(), minlength=len(pesi))
+    return conteggi
+
+
+def _combinazioni_shard(valori, pesi, k, blocchi):
+    contatore = combinazioni.ContatoreCombinazioni(valori, k)
+    for estrazioni in _senza_reinserimento(pesi, k, blocchi):
+        contatore.aggiungi(estrazioni)
+    return contatore
+
+
+def _unisci_contatori(a, b):
+    a.unisci(b)
+    return a
+
+
+def conta_simulazioni(pesi, n_simulazioni, k=15, blocco=BLOCCO, seed=None, workers=None):
+    """Restituisce l'array dei conteggi di ogni indice su tutte le estrazioni simulate."""
+    blocchi = _blocchi(n_simulazioni, blocco, seed)
+    if not blocchi:
+        return np.zeros(len(pesi), dtype=np.int64)
+    return _esegui(_conteggi_shard, (pesi, k), blocchi, workers, np.add)
+
+
+def conta_combinazioni(valori, pesi, n_simulazioni, k=15, blocco=BLOCCO, seed=None, workers=None):
+    """
+    Simula n_simulazioni estrazioni pesate di k valori distinti e restituisce
+    il ContatoreCombinazioni con la frequenza di ogni combinazione uscita.
+    """
+    blocchi = _blocchi(n_simulazioni, blocco, seed)
+    if not blocchi:
+        return combinazioni.ContatoreCombinazioni(valori, k)
+    return _esegui(_combinazioni_shard, (valori, pesi, k), blocchi, workers, _unisci_contatori)
+
+
+def probabilita_monte_carlo(chiavi, pesi, n_simulazioni, k=15, blocco=BLOCCO, seed=None, workers=None):
+    """
+    Stima con n_simulazioni estrazioni da k numeri la probabilità di uscita di ogni chiave.
+    Restituisce un dizionario {chiave: conteggio / (n_simulazioni * k)}.
+    """
+    chiavi = list(chiavi)
+    if n_simulazioni <= 0:
+        return {chiave: 0.0 for chiave in chiavi}
+    conteggi = conta_simulazioni(pesi, n_simulazioni, k, blocco, seed, workers)
+    totale = n_simulazioni * k
+    return {chiave: int(c) / totale for chiave, c in zip(chiavi, conteggi)}
@@ -0,0 +1,201 @@
+"""
+Punteggio vettoriale delle schedine (puntata.txt) contro le estrazioni.
+
+I checker confrontavano ogni riga della puntata con ogni estrazione tramite
+intersezioni di insiemi di stringhe a due cifre. Qui schedine ed estrazioni
+diventano maschere a 25 bit (come in storico.py) e la matrice schedine x
+estrazioni dei numeri indovinati si ottiene con un AND e un popcount
+vettoriali, a blocchi di schedine per limitare la memoria temporanea. Dalla
+matrice si ricavano l'istogramma delle fasce di premio (11-15 numeri) e
+l'elenco delle combinazioni vincenti.
+
+La puntata letta viene salvata accanto al file (dat/puntata.txt ->
+dat/puntata.txt.npz) con le righe normalizzate (numeri a due cifre separati da
+tabulazioni) e le maschere, legate a dimensione e mtime del file come in
+storico.py: le esecuzioni successive non rileggono né riscrivono il testo.
+Il file della puntata viene riscritto in forma normalizzata solo su richiesta
+(normalizza_file, opzione --normalizza dei checker).
+"""
+import itertools
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import storico
+
+FASCE_PREMIO = (11, 12, 13, 14, 15)
+BLOCCO = 4096  # schedine per blocco: con 3400 estrazioni ~56 MB di temporanei uint32
+FILE_PUNTATA = './dat/puntata.txt'
+
+Schedine = namedtuple('Schedine', ['righe', 'maschere'])
+
+
+def maschera_schedina(riga):
+    """Maschera a 25 bit dei numeri della riga; i valori non numerici o fuori da 1..25 sono ignorati."""
+    maschera = 0
+    for valore in riga.split():
+        if valore.isdigit() and 1 <= int(valore) <= storico.NUMERI:
+            maschera |= 1 << (int(valore) - 1)
+    return maschera
+
+
+def maschere_schedine(righe):
+    """Array uint32 con la maschera di ogni riga della puntata (stesso ordine delle righe)."""
+    return np.fromiter((maschera_schedina(riga) for riga in righe), dtype=np.uint32)
+
+
+def normalizza_riga(riga):
+    """
+    Riga con i numeri a due cifre separati da tabulazioni, come la scriveva
+    format_numbers_inplace; None se contiene valori non numerici.
+    """
+    try:
+        return '\t'.join(f"{int(valore):02}" for valore in riga.split())
+    except ValueError:
+        return None
+
+
+def leggi_schedine(percorso):
+    """Legge la puntata normalizzando le righe in memoria (le righe non valide restano com'erano)."""
+    with open(percorso, 'r', encoding='utf-8') as f:
+        originali = [riga.rstrip('\r\n') for riga in f]
+    righe = []
+    for i, riga in enumerate(originali, 1):
+        normalizzata = normalizza_riga(riga)
+        if normalizzata is None:
+            print(f"⚠️ Errore formato riga {i}: {riga.strip()}")
+            normalizzata = riga
+        righe.append(normalizzata)
+    return Schedine(righe, maschere_schedine(righe))
+
+
+def file_cache_schedine(percorso):
+    """Percorso del file binario associato alla puntata."""
+    return percorso + '.npz'
+
+
+def salva_cache_schedine(schedine, percorso_cache, firma):
+    """Scrive la cache della puntata in modo atomico (file temporaneo + rename)."""
+    temporaneo = percorso_cache + '.tmp'
+    try:
+        with open(temporaneo, 'wb') as f:
+            np.savez(
+                f,
+                firma=firma,
+                righe=np.array(schedine.righe, dtype=np.str_),
+                maschere=schedine.maschere,
+            )
+        os.replace(temporaneo, percorso_cache)
+    except OSError as e:
+        print(f"Impossibile salvare la cache '{percorso_cache}': {e}")
+
+
+def carica_schedine(percorso=FILE_PUNTATA):
+    """
+    Righe normalizzate e maschere della puntata, dalla cache binaria se è
+    allineata al file, altrimenti rileggendo il testo. Il file non viene
+    modificato. Solleva FileNotFoundError se la puntata non esiste.
+    """
+    firma = storico.firma_file(percorso)
+    percorso_cache = file_cache_schedine(percorso)
+
+    try:
+        with np.load(percorso_cache) as cache:
+            if np.array_equal(cache['firma'], firma):
+                return Schedine(cache['righe'].tolist(), cache['maschere'])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    schedine = leggi_schedine(percorso)
+    salva_cache_schedine(schedine, percorso_cache, firma)
+    return schedine
+
+
+def normalizza_file(percorso=FILE_PUNTATA):
+    """
+    Riscrive la puntata in forma normalizzata (solo se serve, in modo atomico)
+    e aggiorna la cache. Restituisce il numero di righe cambiate.
+    """
+    schedine = carica_schedine(percorso)
+    with open(percorso, 'r', encoding='utf-8') as f:
+        originali = [riga.rstrip('\r\n') for riga in f]
+    cambiate = sum(1 for prima, dopo in zip(originali, schedine.righe) if prima != dopo)
+    if cambiate == 0:
+        return 0
+
+    temporaneo = percorso + '.tmp'
+    with open(temporaneo, 'w', encoding='utf-8') as f:
+        f.writelines(riga + '\n' for riga in schedine.righe)
+    os.replace(temporaneo, percorso)
+    salva_cache_schedine(schedine, file_cache_schedine(percorso), storico.firma_file(percorso))
+    return cambiate
+
+
+def blocchi_schedine(percorso, blocco=BLOCCO):
+    """
+    Legge la puntata a blocchi di righe senza caricarla tutta: restituisce
+    (numero della prima riga del blocco, righe, maschere) per ogni blocco.
+    """
+    with open(percorso, 'r', encoding='utf-8') as f:
+        inizio = 1
+        while True:
+            righe = list(itertools.islice(f, blocco))
+            if not righe:
+                return
+            yield inizio, righe, maschere_schedine(righe)
+            inizio += len(righe)
+
+
+def matrice_punti(schedine, estrazioni, blocco=BLOCCO):
+    """
+    Matrice uint8 schedine x estrazioni con i numeri indovinati.
+    schedine ed estrazioni sono array di maschere a 25 bit.
+    """
+    schedine = np.asarray(schedine, dtype=np.uint32)
+    estrazioni = np.asarray(estrazioni, dtype=np.uint32)
+    punti = np.empty((len(schedine), len(estrazioni)), dtype=np.uint8)
+    for inizio in range(0, len(schedine), blocco):
+        parte = schedine[inizio:inizio + blocco]
+        punti[inizio:inizio + len(parte)] = storico.popcount(parte[:, None] & estrazioni[None, :])
+    return punti
+
+
+def istogramma(punti):
+    """Dizionario fascia -> numero di combinazioni (schedina, estrazione) con quei numeri indovinati."""
+    conteggi = np.bincount(np.asarray(punti, dtype=np.uint8).ravel(), minlength=storico.NUMERI + 1)
+    return {fascia: int(conteggi[fascia]) for fascia in FASCE_PREMIO}
+
+
+def vincite(punti, minimo=FASCE_PREMIO[0]):
+    """
+    Coppie vincenti come array (indici schedina, indici estrazione, numeri indovinati),
+    ordinate per numeri indovinati decrescenti.
+    """
+    punti = np.asarray(punti)
+    if punti.ndim == 1:
+        punti = punti[:, None]
+    righe, colonne = np.nonzero(punti >= minimo)
+    valori = punti[righe, colonne]
+    ordine = np.argsort(-valori.astype(np.int16), kind='stable')
+    return righe[ordine], colonne[ordine], valori[ordine]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Prepara la cache binaria della puntata.")
+    parser.add_argument("puntata", nargs='?', default=FILE_PUNTATA, help=f"File delle righe giocate (default: {FILE_PUNTATA})")
+    parser.add_argument("--normalizza", action="store_true", help="Riscrive il file con i numeri a due cifre")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.puntata):
+        print(f"❌ Errore: Il file '{args.puntata}' non esiste.")
+        return
+    if args.normalizza:
+        print(f"Righe normalizzate in '{args.puntata}': {normalizza_file(args.puntata)}")
+    schedine = carica_schedine(args.puntata)
+    print(f"Cache '{file_cache_schedine(args.puntata)}': {len(schedine.righe)} righe.")
+
+
+if __name__ == "__main__":
+    main()
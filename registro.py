@@ -0,0 +1,331 @@
+"""
+Registro append-only delle estrazioni (dat/dati.log).
+
+Ogni nuova estrazione viene aggiunta in coda al registro come una riga nel
+formato di dati.txt seguita dal CRC32 della riga stessa, poi il file viene
+sincronizzato su disco (fsync): il costo di scrittura è costante e non dipende
+dalla lunghezza dello storico.
+
+Accanto al registro c'è un indice (dat/dati.idx) con gli offset delle righe
+in ordine di concorso crescente. Un'estrazione più recente di quelle presenti
+(il caso normale) accoda la sua voce all'indice e aggiorna l'header, senza
+riscriverlo; negli altri casi l'indice viene riscritto in modo atomico (file
+temporaneo + rename). Un indice incoerente con il registro viene ricostruito.
+Una riga scritta a metà (ad esempio per un kill durante la scrittura) viene
+riconosciuta dal CRC mancante o errato e ignorata.
+
+Solo chi scrive modifica i file: le scritture prendono un lock esclusivo
+(fcntl.flock) sul registro, rileggono lo stato, troncano l'eventuale riga
+parziale e aggiornano l'indice. Chi legge non tronca e non riscrive nulla, per
+cui può aprire il registro mentre uno scraper sta aggiungendo un'estrazione.
+
+Gli script leggono direttamente il registro (vedi storico.sorgente); dati.txt
+si rigenera solo su richiesta con il comando esporta.
+
+Uso da riga di comando:
+    python3 registro.py importa dat/dati.txt dat/dati.log
+    python3 registro.py esporta dat/dati.log dat/dati.txt
+"""
+import bisect
+import contextlib
+import fcntl
+import os
+import struct
+import zlib
+
+FILE_REGISTRO = './dat/dati.log'
+
+_MAGIC = b'LOTOIDX2'
+_HEADER = struct.Struct('<8sQQ')  # magic, lunghezza coperta del registro, numero voci
+_VOCE = struct.Struct('<qQ')  # concorso, offset
+
+
+def file_indice(percorso_registro):
+    """Percorso dell'indice associato al registro."""
+    return os.path.splitext(percorso_registro)[0] + '.idx'
+
+
+def formatta_riga(concorso, data, numeri):
+    """Riga nel formato di dati.txt: concorso, data e 15 numeri separati da tab."""
+    return f"{int(concorso)}\t{data}\t" + "\t".join(f"{int(n):02}" for n in numeri)
+
+
+def _codifica_record(riga):
+    contenuto = riga.encode('utf-8')
+    return contenuto + b'\t' + f"{zlib.crc32(contenuto):08x}".encode('ascii') + b'\n'
+
+
+def _decodifica_record(record):
+    """Restituisce la riga se il record è completo e il CRC corrisponde, altrimenti None."""
+    if not record.endswith(b'\n'):
+        return None
+    contenuto, sep, crc = record[:-1].rpartition(b'\t')
+    if not sep or len(crc) != 8:
+        return None
+    try:
+        if int(crc, 16) != zlib.crc32(contenuto):
+            return None
+    except ValueError:
+        return None
+    return contenuto.decode('utf-8')
+
+
+def _scrivi_atomico(percorso, contenuto):
+    temporaneo = percorso + '.tmp'
+    with open(temporaneo, 'wb') as f:
+        f.write(contenuto)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaneo, percorso)
+
+
+class Registro:
+    """
+    Registro aperto: tiene in memoria l'indice (concorso -> offset) dei
+    record validi. Le aggiunte passano da _scrittura().
+    """
+
+    def __init__(self, percorso=FILE_REGISTRO):
+        self.percorso = percorso
+        self.percorso_indice = file_indice(percorso)
+        self.voci = []  # (concorso, offset) dal più vecchio al più recente
+        self.lunghezza = 0
+        self._concorsi = set()
+        self._indice_valido = False
+        self._apri()
+
+    def _apri(self):
+        if not os.path.exists(self.percorso):
+            open(self.percorso, 'ab').close()
+
+        coperto = self._leggi_indice()
+        dimensione = os.path.getsize(self.percorso)
+        self._indice_valido = coperto is not None and coperto <= dimensione
+        if not self._indice_valido:
+            # Indice assente o non coerente: ricostruzione completa
+            self.voci = []
+            coperto = 0
+        self.lunghezza = coperto
+        self._concorsi = {concorso for concorso, _ in self.voci}
+
+        if dimensione > coperto:
+            self._recupera_coda(coperto)
+
+    def _leggi_indice(self):
+        try:
+            with open(self.percorso_indice, 'rb') as f:
+                contenuto = f.read()
+        except FileNotFoundError:
+            return None
+        if len(contenuto) < _HEADER.size:
+            return None
+        magic, coperto, n_voci = _HEADER.unpack_from(contenuto)
+        if magic != _MAGIC or len(contenuto) != _HEADER.size + n_voci * _VOCE.size:
+            return None
+        self.voci = list(_VOCE.iter_unpack(contenuto[_HEADER.size:]))
+        return coperto
+
+    def _recupera_coda(self, inizio):
+        """
+        Indicizza in memoria i record validi oltre la parte coperta dall'indice,
+        fermandosi al primo record parziale. Non modifica i file: il
+        troncamento e il salvataggio dell'indice spettano a chi scrive.
+        """
+        with open(self.percorso, 'rb') as f:
+            f.seek(inizio)
+            offset = inizio
+            for record in f:
+                riga = _decodifica_record(record)
+                if riga is None:
+                    break
+                self._indicizza(int(riga.split('\t', 1)[0]), offset)
+                self._indice_valido = False
+                offset += len(record)
+        self.lunghezza = offset
+
+    @contextlib.contextmanager
+    def _scrittura(self):
+        """
+        Lock esclusivo sul registro per tutta la scrittura. Sotto lock lo
+        stato viene riletto (un altro processo può aver aggiunto righe), il
+        record parziale in coda viene scartato e l'indice riallineato.
+        """
+        with open(self.percorso, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._apri()
+            dimensione = f.seek(0, os.SEEK_END)
+            if dimensione > self.lunghezza:
+                print(f"⚠️ Record incompleto in coda a '{self.percorso}' scartato ({dimensione - self.lunghezza} byte).")
+                f.truncate(self.lunghezza)
+                f.flush()
+                os.fsync(f.fileno())
+            if not self._indice_valido:
+                self._salva_indice()
+                self._indice_valido = True
+            yield f
+
+    def _indicizza(self, concorso, offset):
+        """Inserisce la voce; restituisce True se è finita in coda (concorso più recente)."""
+        self._concorsi.add(concorso)
+        if not self.voci or concorso > self.voci[-1][0]:
+            self.voci.append((concorso, offset))
+            return True
+        bisect.insort(self.voci, (concorso, offset))
+        return False
+
+    def _salva_indice(self):
+        contenuto = bytearray(_HEADER.pack(_MAGIC, self.lunghezza, len(self.voci)))
+        for concorso, offset in self.voci:
+            contenuto += _VOCE.pack(concorso, offset)
+        _scrivi_atomico(self.percorso_indice, bytes(contenuto))
+
+    def _accoda_indice(self, nuove):
+        """
+        Scrive in coda all'indice le ultime `nuove` voci, poi l'header. Se si
+        interrompe a metà, la lunghezza non torna con l'header e all'apertura
+        l'indice viene ricostruito dal registro.
+        """
+        precedenti = len(self.voci) - nuove
+        try:
+            with open(self.percorso_indice, 'r+b') as f:
+                if f.seek(0, os.SEEK_END) != _HEADER.size + precedenti * _VOCE.size:
+                    raise OSError("indice non allineato")
+                f.write(b''.join(_VOCE.pack(*voce) for voce in self.voci[precedenti:]))
+                f.flush()
+                os.fsync(f.fileno())
+                f.seek(0)
+                f.write(_HEADER.pack(_MAGIC, self.lunghezza, len(self.voci)))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            self._salva_indice()
+
+    def __contains__(self, concorso):
+        return int(concorso) in self._concorsi
+
+    def __len__(self):
+        return len(self.voci)
+
+    def aggiungi(self, concorso, data, numeri):
+        """
+        Aggiunge un'estrazione in coda al registro. Restituisce False se il
+        concorso è già presente (l'operazione è idempotente).
+        """
+        concorso = int(concorso)
+        if concorso in self._concorsi:
+            return False
+        return self.aggiungi_righe([formatta_riga(concorso, data, numeri)]) == 1
+
+    def aggiungi_righe(self, righe):
+        """Aggiunge più righe già formattate con una sola fsync; restituisce quante ne ha scritte."""
+        righe = list(righe)
+        with self._scrittura() as f:
+            offset = self.lunghezza
+            nuove = []
+            visti = set(self._concorsi)
+            blocco = bytearray()
+            for riga in righe:
+                concorso = int(riga.split('\t', 1)[0])
+                if concorso in visti:
+                    continue
+                visti.add(concorso)
+                record = _codifica_record(riga)
+                nuove.append((concorso, offset))
+                blocco += record
+                offset += len(record)
+            if not nuove:
+                return 0
+
+            f.seek(self.lunghezza)
+            f.write(blocco)
+            f.flush()
+            os.fsync(f.fileno())
+
+            in_coda = True
+            for concorso, offset_record in nuove:
+                in_coda = self._indicizza(concorso, offset_record) and in_coda
+            self.lunghezza = offset
+            if in_coda:
+                self._accoda_indice(len(nuove))
+            else:
+                self._salva_indice()
+        return len(nuove)
+
+    def righe(self):
+        """Restituisce le righe nel formato di dati.txt, dal concorso più recente."""
+        with open(self.percorso, 'rb') as f:
+            contenuto = f.read(self.lunghezza)
+        risultato = []
+        for _, offset in reversed(self.voci):
+            fine = contenuto.index(b'\n', offset)
+            riga = _decodifica_record(contenuto[offset:fine + 1])
+            if riga is not None:
+                risultato.append(riga)
+        return risultato
+
+    def righe_da(self, offset=0):
+        """Righe scritte a partire dall'offset dato, nell'ordine in cui sono state aggiunte."""
+        with open(self.percorso, 'rb') as f:
+            f.seek(offset)
+            contenuto = f.read(max(0, self.lunghezza - offset))
+        risultato = []
+        for record in contenuto.splitlines(keepends=True):
+            riga = _decodifica_record(record)
+            if riga is not None:
+                risultato.append(riga)
+        return risultato
+
+
+def aggiungi_estrazione(concorso, data, numeri, percorso=FILE_REGISTRO):
+    """Aggiunge un'estrazione al registro; restituisce False se era già presente."""
+    return Registro(percorso).aggiungi(concorso, data, numeri)
+
+
+def leggi_righe(percorso=FILE_REGISTRO):
+    """Righe del registro nel formato di dati.txt, dalla più recente."""
+    return Registro(percorso).righe()
+
+
+def importa_testo(nome_file, percorso=FILE_REGISTRO):
+    """Importa nel registro le righe di un file in formato dati.txt (dal più vecchio)."""
+    righe = []
+    with open(nome_file, 'r', encoding='utf-8') as f:
+        for linea in f:
+            dati = linea.split()
+            if len(dati) < 17:
+                continue
+            righe.append(formatta_riga(dati[0], dati[1], dati[2:17]))
+    righe.reverse()
+    return Registro(percorso).aggiungi_righe(righe)
+
+
+def esporta_testo(nome_file, percorso=FILE_REGISTRO):
+    """Scrive il registro in formato dati.txt (dal più recente) in modo atomico."""
+    righe = leggi_righe(percorso)
+    contenuto = "".join(riga + "\n" for riga in righe)
+    _scrivi_atomico(nome_file, contenuto.encode('utf-8'))
+    return len(righe)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Gestione del registro append-only delle estrazioni.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_imp = sub.add_parser('importa', help="Importa un file dati.txt nel registro")
+    p_imp.add_argument('nome_file')
+    p_imp.add_argument('registro', nargs='?', default=FILE_REGISTRO)
+    p_esp = sub.add_parser('esporta', help="Rigenera un file dati.txt dal registro")
+    p_esp.add_argument('registro')
+    p_esp.add_argument('nome_file')
+    args = parser.parse_args()
+
+    if args.comando == 'importa':
+        n = importa_testo(args.nome_file, args.registro)
+        print(f"✅ Importate {n} estrazioni in '{args.registro}'")
+    else:
+        n = esporta_testo(args.nome_file, args.registro)
+        print(f"✅ Esportate {n} estrazioni in '{args.nome_file}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Sessione Selenium persistente per leggere l'ultimo risultato della Lotofácil.
+
+downloaddati*.py e check_risultato-*.py risolvevano il driver con
+ChromeDriverManager().install() e avviavano un Chrome nuovo a ogni esecuzione,
+poi aspettavano un ritardo casuale: ogni lettura pagava risoluzione del driver,
+avvio del browser e caricamento della pagina. Qui:
+
+- il percorso del chromedriver viene salvato in dat/chromedriver.path (o preso
+  da CHROMEDRIVER) e ChromeDriverManager viene usato solo se manca o non parte;
+- il browser headless resta aperto nel processo e viene riusato (e riavviato
+  se non risponde o dopo MAX_RICHIESTE letture);
+- l'attesa è quella degli elementi della pagina, non un ritardo fisso.
+
+Con il demone (python3 scraper.py servi) un solo browser resta caldo tra
+un'esecuzione e l'altra degli script: ultimo_risultato() lo interroga su un
+socket locale e, se il demone non è attivo o non risponde entro
+ATTESA_DEMONE secondi, usa un browser nel processo. Richieste e risposte sono
+una riga JSON ciascuna (nessun pickle) e la richiesta porta una chiave
+casuale generata al primo avvio del demone in dat/scraper.key (permessi 0600),
+o presa da LOTOF_SCRAPER_CHIAVE.
+
+Uso da riga di comando:
+    python3 scraper.py servi      # demone con il browser sempre pronto
+    python3 scraper.py ultimo     # legge l'ultimo risultato (dal demone se attivo)
+"""
+import hmac
+import json
+import os
+import secrets
+import socket
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+URL_LOTOFACIL = "https://loterias.caixa.gov.br/Paginas/Lotofacil.aspx"
+SELETTORE_NUMERI = "ul.simple-container.lista-dezenas.lotofacil li"
+SELETTORE_CONCORSO = "span.ng-binding"
+
+FILE_DRIVER = './dat/chromedriver.path'
+INDIRIZZO = ('127.0.0.1', int(os.getenv("LOTOF_SCRAPER_PORTA", "6017")))
+FILE_CHIAVE = './dat/scraper.key'
+ATTESA = 20          # secondi massimi di attesa degli elementi della pagina
+ATTESA_DEMONE = 2 * ATTESA + 15  # oltre questo tempo il demone è considerato bloccato
+MAX_RICHIESTA = 4096  # byte massimi di una richiesta al demone
+MAX_RICHIESTE = 200  # letture dopo cui il browser viene riavviato
+
+_driver = None
+_richieste = 0
+
+
+def percorso_driver(aggiorna=False):
+    """
+    Percorso del chromedriver: CHROMEDRIVER, altrimenti quello salvato in
+    FILE_DRIVER; ChromeDriverManager viene interpellato solo se manca o se
+    aggiorna è vero, e il risultato viene salvato per le esecuzioni successive.
+    """
+    if os.getenv("CHROMEDRIVER"):
+        return os.getenv("CHROMEDRIVER")
+    if not aggiorna:
+        try:
+            with open(FILE_DRIVER, 'r', encoding='utf-8') as f:
+                percorso = f.read().strip()
+            if percorso and os.access(percorso, os.X_OK):
+                return percorso
+        except OSError:
+            pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    percorso = ChromeDriverManager().install()
+    try:
+        temporaneo = FILE_DRIVER + '.tmp'
+        with open(temporaneo, 'w', encoding='utf-8') as f:
+            f.write(percorso + '\n')
+        os.replace(temporaneo, FILE_DRIVER)
+    except OSError as e:
+        print(f"Impossibile salvare il percorso del driver in '{FILE_DRIVER}': {e}")
+    return percorso
+
+
+def opzioni_chrome(headless=True):
+    """Opzioni comuni degli script: niente tracce di Selenium, user agent di un browser normale."""
+    chrome_options = Options()
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("start-maximized")
+    chrome_options.add_argument(
+        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/99.0.4844.51 Safari/537.36"
+    )
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    return chrome_options
+
+
+def avvia_browser(headless=True):
+    """Avvia Chrome con il driver in cache; se la versione non è più compatibile aggiorna il driver e riprova."""
+    try:
+        driver = webdriver.Chrome(service=Service(percorso_driver()), options=opzioni_chrome(headless))
+    except (WebDriverException, OSError):
+        if os.getenv("CHROMEDRIVER"):
+            raise
+        driver = webdriver.Chrome(service=Service(percorso_driver(aggiorna=True)), options=opzioni_chrome(headless))
+
+    # Disabilita la property navigator.webdriver via CDP
+    driver.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument",
+        {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"},
+    )
+    return driver
+
+
+def chiudi_browser():
+    """Chiude il browser del processo, se aperto."""
+    global _driver, _richieste
+    if _driver is not None:
+        try:
+            _driver.quit()
+        except WebDriverException:
+            pass
+    _driver = None
+    _richieste = 0
+
+
+def browser():
+    """Browser condiviso del processo: lo avvia alla prima richiesta e lo riavvia se non risponde."""
+    global _driver
+    if _driver is not None and _richieste >= MAX_RICHIESTE:
+        chiudi_browser()
+    if _driver is not None:
+        try:
+            _driver.current_url
+        except WebDriverException:
+            chiudi_browser()
+    if _driver is None:
+        _driver = avvia_browser()
+    return _driver
+
+
+def leggi_risultato(driver, pagina=False):
+    """
+    Carica la pagina ufficiale e restituisce un dizionario con concorso, data,
+    numeri (stringhe, nell'ordine della pagina), il testo grezzo del concorso
+    e, se richiesto, l'HTML della pagina. Concorso e data valgono '???' se il
+    testo non è nel formato "Concurso 3344 (17/03/2025)".
+    """
+    driver.get(URL_LOTOFACIL)
+    attesa = WebDriverWait(driver, ATTESA)
+    attesa.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, SELETTORE_NUMERI)))
+    attesa.until(EC.text_to_be_present_in_element((By.CSS_SELECTOR, SELETTORE_CONCORSO), "Concurso"))
+
+    testo = driver.find_element(By.CSS_SELECTOR, SELETTORE_CONCORSO).text.strip()
+    if "Concurso" in testo and "(" in testo:
+        concorso = testo.split("(")[0].replace("Concurso", "").strip()
+        data = testo.split("(")[1].replace(")", "").strip()
+    else:
+        concorso = data = "???"
+    numeri = [n.text.strip() for n in driver.find_elements(By.CSS_SELECTOR, SELETTORE_NUMERI)]
+
+    risultato = {
+        'concorso': concorso,
+        'data': data,
+        'numeri': [n for n in numeri if n.isdigit()],
+        'testo': testo,
+    }
+    if pagina:
+        risultato['pagina'] = driver.page_source
+    return risultato
+
+
+def risultato_locale(pagina=False):
+    """Legge l'ultimo risultato con il browser del processo (riusato tra chiamate successive)."""
+    global _richieste
+    driver = browser()
+    _richieste += 1
+    try:
+        return leggi_risultato(driver, pagina)
+    except TimeoutException:
+        raise
+    except WebDriverException:
+        # Sessione caduta durante la lettura: un solo nuovo tentativo con un browser nuovo
+        chiudi_browser()
+        _richieste += 1
+        return leggi_risultato(browser(), pagina)
+
+
+def chiave(crea=False):
+    """
+    Chiave condivisa tra demone e script: LOTOF_SCRAPER_CHIAVE, altrimenti il
+    contenuto di FILE_CHIAVE. Con crea il file viene generato se manca
+    (leggibile solo dall'utente); senza, restituisce None se non esiste.
+    """
+    if os.getenv("LOTOF_SCRAPER_CHIAVE"):
+        return os.getenv("LOTOF_SCRAPER_CHIAVE")
+    if crea:
+        try:
+            fd = os.open(FILE_CHIAVE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                f.write(secrets.token_hex(32) + '\n')
+    try:
+        with open(FILE_CHIAVE, 'r', encoding='ascii') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _leggi_messaggio(conn):
+    """Legge la risposta del demone (una riga JSON) dal socket."""
+    dati = bytearray()
+    while not dati.endswith(b'\n'):
+        parte = conn.recv(65536)
+        if not parte:
+            break
+        dati += parte
+    return json.loads(dati)
+
+
+def _chiedi_al_demone(pagina, indirizzo, chiave_demone):
+    """Risposta del demone come dizionario; OSError se non è raggiungibile o non risponde in tempo."""
+    with socket.create_connection(indirizzo, timeout=ATTESA_DEMONE) as conn:
+        richiesta = {'chiave': chiave_demone, 'comando': 'ultimo', 'pagina': bool(pagina)}
+        conn.sendall(json.dumps(richiesta).encode('utf-8') + b'\n')
+        return _leggi_messaggio(conn)
+
+
+def ultimo_risultato(pagina=False, indirizzo=INDIRIZZO):
+    """
+    Ultimo risultato dal demone se è attivo (browser già caldo), altrimenti
+    con un browser nel processo. Solleva RuntimeError se il demone segnala un
+    errore nella lettura della pagina.
+    """
+    chiave_demone = chiave()
+    if chiave_demone is None:
+        return risultato_locale(pagina)
+    try:
+        risposta = _chiedi_al_demone(pagina, indirizzo, chiave_demone)
+    except (OSError, ValueError) as e:
+        if not isinstance(e, ConnectionRefusedError):
+            print(f"⚠️ Demone dello scraper non disponibile ({e}): uso un browser locale.")
+        return risultato_locale(pagina)
+    if risposta.get('esito') == 'non autorizzato':
+        print("⚠️ Chiave del demone dello scraper non valida: uso un browser locale.")
+        return risultato_locale(pagina)
+    if risposta.get('esito') != 'ok':
+        raise RuntimeError(risposta.get('messaggio'))
+    return risposta['risultato']
+
+
+def _rispondi(conn, chiave_demone):
+    """Serve una richiesta; restituisce (comando, esito) per il log."""
+    dati = bytearray()
+    while not dati.endswith(b'\n') and len(dati) <= MAX_RICHIESTA:
+        parte = conn.recv(MAX_RICHIESTA)
+        if not parte:
+            break
+        dati += parte
+    try:
+        richiesta = json.loads(dati)
+        chiave_ricevuta = str(richiesta['chiave'])
+        comando = richiesta.get('comando')
+    except (ValueError, TypeError, KeyError):
+        return None, 'richiesta non valida'
+    if not hmac.compare_digest(chiave_ricevuta.encode('utf-8'), chiave_demone.encode('utf-8')):
+        risposta = {'esito': 'non autorizzato'}
+    elif comando != 'ultimo':
+        risposta = {'esito': 'errore', 'messaggio': f"comando sconosciuto: {comando}"}
+    else:
+        try:
+            risposta = {'esito': 'ok', 'risultato': risultato_locale(bool(richiesta.get('pagina')))}
+        except Exception as e:
+            risposta = {'esito': 'errore', 'messaggio': str(e)}
+    conn.sendall(json.dumps(risposta).encode('utf-8') + b'\n')
+    return comando, risposta['esito']
+
+
+def servi(indirizzo=INDIRIZZO):
+    """Demone: tiene aperto il browser e risponde alle richieste una alla volta."""
+    chiave_demone = chiave(crea=True)
+    if chiave_demone is None:
+        print(f"❌ Impossibile creare la chiave del demone in '{FILE_CHIAVE}'.")
+        return
+    browser()
+    print(f"🌐 Scraper pronto su {indirizzo[0]}:{indirizzo[1]}")
+    try:
+        with socket.create_server(indirizzo) as server:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    # Un client lento non deve bloccare il demone
+                    conn.settimeout(5)
+                    inizio = time.perf_counter()
+                    try:
+                        comando, esito = _rispondi(conn, chiave_demone)
+                    except OSError as e:
+                        comando, esito = None, f"connessione interrotta ({e})"
+                    print(f"{comando}: {esito} in {time.perf_counter() - inizio:.2f} s")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        chiudi_browser()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Sessione Selenium persistente per i risultati Lotofácil.")
+    parser.add_argument("comando", choices=['servi', 'ultimo'], help="servi: avvia il demone; ultimo: legge l'ultimo risultato")
+    args = parser.parse_args()
+
+    if args.comando == 'servi':
+        servi()
+        return
+    inizio = time.perf_counter()
+    try:
+        risultato = ultimo_risultato()
+    finally:
+        chiudi_browser()
+    print(f"Concorso {risultato['concorso']} ({risultato['data']}): {' '.join(risultato['numeri'])}")
+    print(f"⏱️ {time.perf_counter() - inizio:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
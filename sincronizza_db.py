@@ -0,0 +1,193 @@
+"""
+Sincronizzazione idempotente tra lo storico locale e la tabella estrazioni_reali.
+
+Invece di rieseguire carica_estrazioni.py su tutto il file, lo storico viene
+diviso in blocchi (un blocco per mese di estrazione) e per ogni blocco si
+confronta una firma: numero di righe e XOR dei CRC32 delle righe
+"AAAA-MM-GG,n1,...,n15". Le firme lato DB si ottengono con una sola query
+GROUP BY; solo per i blocchi con firma diversa si scaricano le righe, e al DB
+si inviano soltanto quelle mancanti o modificate, con INSERT ... ON DUPLICATE
+KEY UPDATE (la tabella è indicizzata in modo univoco sulla data, come già
+presupposto dall'INSERT IGNORE di carica_estrazioni.py). Rieseguire il comando
+senza novità non scrive nulla.
+
+La tabella non ha il numero di concorso, quindi la chiave delle righe è la
+data. Le date con più concorsi diversi (in dati.txt i concorsi 3073 e 3082
+hanno entrambi 08/04/2024) vengono segnalate ed escluse dalla
+sincronizzazione: con la data come chiave uno dei due sovrascriverebbe l'altro
+in silenzio. Queste date vanno corrette nel file; il backend SQLite
+(db_locale.py) usa invece il concorso come chiave e le conserva entrambe. Le
+righe presenti solo nel DB vengono segnalate ma non cancellate.
+
+Uso, ad esempio dopo downloaddati4.py:
+    python3 sincronizza_db.py dat/dati.log --user ... --password ...
+"""
+import argparse
+import datetime
+import os
+import zlib
+
+import mysql.connector
+
+import carica_estrazioni
+import registro
+
+COLONNE_NUMERI = ", ".join(f"n{i}" for i in range(1, 16))
+
+UPSERT_ESTRAZIONE = f"""
+    INSERT INTO estrazioni_reali (data, {COLONNE_NUMERI})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE {", ".join(f"n{i} = VALUES(n{i})" for i in range(1, 16))}
+"""
+
+FIRME_DB = f"""
+    SELECT YEAR(data), MONTH(data), COUNT(*),
+           BIT_XOR(CRC32(CONCAT_WS(',', DATE_FORMAT(data, '%Y-%m-%d'), {COLONNE_NUMERI})))
+    FROM estrazioni_reali
+    GROUP BY YEAR(data), MONTH(data)
+"""
+
+
+def firma_riga(data, numeri):
+    """CRC32 della riga come la calcola MariaDB: CONCAT_WS(',', data, n1, ..., n15)."""
+    testo = ",".join([data.isoformat(), *(str(int(n)) for n in numeri)])
+    return zlib.crc32(testo.encode('ascii'))
+
+
+def blocco(data):
+    return data.year, data.month
+
+
+def leggi_storico(nome_file):
+    """
+    Legge dati.txt o il registro .log e restituisce (storico, duplicate):
+    storico è {data: numeri} (prima riga per concorso), duplicate è
+    {data: concorsi} per le date con più concorsi diversi, escluse dallo storico.
+    """
+    if nome_file.endswith('.log'):
+        estrazioni = carica_estrazioni.leggi_estrazioni(registro.leggi_righe(nome_file))
+    else:
+        estrazioni = carica_estrazioni.leggi_file(nome_file, con_concorso=True)
+    storico = {}
+    concorsi = {}
+    for concorso, data, numeri in estrazioni:
+        concorsi.setdefault(data, set()).add(concorso)
+        storico.setdefault(data, tuple(numeri))
+    duplicate = {data: sorted(c) for data, c in concorsi.items() if len(c) > 1}
+    for data in duplicate:
+        del storico[data]
+    return storico, duplicate
+
+
+def firme_storico(storico):
+    firme = {}
+    for data, numeri in storico.items():
+        conteggio, xor = firme.get(blocco(data), (0, 0))
+        firme[blocco(data)] = (conteggio + 1, xor ^ firma_riga(data, numeri))
+    return firme
+
+
+def firme_db(cursor):
+    cursor.execute(FIRME_DB)
+    return {(int(anno), int(mese)): (int(n), int(xor)) for anno, mese, n, xor in cursor.fetchall()}
+
+
+def righe_db(cursor, blocchi):
+    """Righe del DB nei mesi indicati, come {data: numeri}."""
+    righe = {}
+    for anno, mese in sorted(blocchi):
+        inizio = datetime.date(anno, mese, 1)
+        fine = datetime.date(anno + (mese == 12), mese % 12 + 1, 1)
+        cursor.execute(
+            f"SELECT data, {COLONNE_NUMERI} FROM estrazioni_reali WHERE data >= %s AND data < %s",
+            (inizio, fine),
+        )
+        for data, *numeri in cursor.fetchall():
+            if isinstance(data, datetime.datetime):
+                data = data.date()
+            righe[data] = tuple(int(n) for n in numeri)
+    return righe
+
+
+def sincronizza(conn, storico, batch=carica_estrazioni.BATCH_DEFAULT, prova=False, escluse=()):
+    """
+    Allinea la tabella allo storico e restituisce (righe inviate, blocchi diversi, righe solo nel DB).
+    Con prova=True calcola le differenze senza scrivere. Le date in escluse
+    (duplicate nel file) non vengono né scritte né contate tra le righe solo nel DB.
+    """
+    cursor = conn.cursor()
+    locali = firme_storico(storico)
+    remote = firme_db(cursor)
+    # I mesi con una data esclusa risultano sempre diversi se il DB ha quella data:
+    # costano una query per mese ma non producono scritture.
+    diversi = {b for b, firma in locali.items() if remote.get(b) != firma}
+
+    da_inviare = []
+    solo_db = sum(n for b, (n, _) in remote.items() if b not in locali)
+    if diversi:
+        presenti = righe_db(cursor, diversi)
+        for data, numeri in sorted(storico.items()):
+            if blocco(data) in diversi and presenti.get(data) != numeri:
+                da_inviare.append((data, *numeri))
+        solo_db += sum(1 for data in presenti if data not in storico and data not in escluse)
+
+    if da_inviare and not prova:
+        for righe in carica_estrazioni.a_blocchi(da_inviare, max(1, batch)):
+            cursor.executemany(UPSERT_ESTRAZIONE, righe)
+        conn.commit()
+    cursor.close()
+    return len(da_inviare), len(diversi), solo_db
+
+
+def main():
+    predefinito = registro.FILE_REGISTRO if os.path.exists(registro.FILE_REGISTRO) else './dat/dati.txt'
+    parser = argparse.ArgumentParser(description="Sincronizza lo storico locale con la tabella estrazioni_reali.")
+    parser.add_argument("nome_file", nargs='?', default=predefinito, help=f"dati.txt o registro .log (default: {predefinito})")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="tuo_utente")
+    parser.add_argument("--password", default="tua_password")
+    parser.add_argument("--database", default="lotterie")
+    parser.add_argument("--batch", type=int, default=carica_estrazioni.BATCH_DEFAULT, help="Righe per INSERT multi-riga")
+    parser.add_argument("--prova", action="store_true", help="Mostra le differenze senza scrivere nel DB")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.nome_file):
+        print(f"Errore: il file '{args.nome_file}' non esiste.")
+        return
+
+    storico, duplicate = leggi_storico(args.nome_file)
+    for data, concorsi in sorted(duplicate.items()):
+        elenco = ", ".join(map(str, concorsi))
+        print(f"⚠️ Data {data:%d/%m/%Y} ignorata: più concorsi con la stessa data ({elenco})")
+    if not storico:
+        print("Nessuna estrazione valida trovata nel file.")
+        return
+
+    try:
+        conn = mysql.connector.connect(
+            host=args.host,
+            user=args.user,
+            password=args.password,
+            database=args.database
+        )
+    except mysql.connector.Error as err:
+        print(f"Errore nella connessione al DB: {err}")
+        return
+
+    try:
+        inviate, diversi, solo_db = sincronizza(conn, storico, args.batch, args.prova, duplicate)
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"❌ Errore durante la sincronizzazione: {err}")
+        return
+    finally:
+        conn.close()
+
+    azione = "da inviare" if args.prova else "inviate"
+    print(f"✅ Blocchi diversi: {diversi}, righe {azione}: {inviate}")
+    if solo_db:
+        print(f"ℹ️ Righe presenti solo nel DB (non cancellate): {solo_db}")
+
+
+if __name__ == "__main__":
+    main()
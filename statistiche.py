@@ -0,0 +1,158 @@
+"""
+Statistiche sufficienti dello storico, aggiornate in modo incrementale.
+
+Per i modelli basati sulle frequenze basta conoscere, per ogni numero, quante
+volte è uscito, con quali altri numeri (matrice delle coppie 25 x 25), l'ultimo
+concorso in cui è comparso e il totale delle estrazioni. Queste grandezze
+vengono salvate in un file accanto ai dati (dat/dati.log -> dat/dati.log.stat.npz)
+e, per il registro append-only, aggiornate leggendo solo i record scritti dopo
+l'ultima istantanea: aggiungere un'estrazione costa O(1) invece di ricontare
+l'intero storico. Un dati.txt con il registro accanto viene letto dal registro
+(storico.sorgente); per un file di testo senza registro l'istantanea è legata
+a dimensione e mtime del file e viene ricalcolata quando cambia.
+"""
+import hashlib
+import os
+from collections import Counter
+
+import numpy as np
+
+import registro
+import storico
+
+
+class Statistiche:
+    """Conteggi per numero, conteggi delle coppie, ultimo concorso visto e totale."""
+
+    def __init__(self):
+        n = storico.NUMERI
+        self.conteggi = np.zeros(n, dtype=np.int64)
+        self.coppie = np.zeros((n, n), dtype=np.int64)  # diagonale = conteggi
+        self.ultimo_concorso = np.zeros(n, dtype=np.int64)  # 0 = mai uscito
+        self.totale = 0
+
+    @classmethod
+    def da_storico(cls, dati):
+        statistiche = cls()
+        statistiche.aggiungi(dati.maschere, dati.concorsi)
+        return statistiche
+
+    def aggiungi(self, maschere, concorsi):
+        """Aggiunge un blocco di estrazioni (maschere a 25 bit e numeri di concorso)."""
+        bits = storico.matrice_bit(maschere)
+        if len(bits) == 0:
+            return
+        uni = bits.astype(np.int64)
+        self.conteggi += uni.sum(axis=0)
+        self.coppie += uni.T @ uni
+        concorsi = np.asarray(concorsi, dtype=np.int64)
+        visti = np.where(bits, concorsi[:, None], 0).max(axis=0)
+        np.maximum(self.ultimo_concorso, visti, out=self.ultimo_concorso)
+        self.totale += len(bits)
+
+    @property
+    def ultimo(self):
+        """Concorso più recente incluso nelle statistiche."""
+        return int(self.ultimo_concorso.max()) if self.totale else 0
+
+    def contatore(self):
+        """Counter {numero: uscite} dei numeri usciti almeno una volta."""
+        return Counter({num: int(c) for num, c in enumerate(self.conteggi, start=1) if c})
+
+    def ritardi(self):
+        """Concorsi trascorsi dall'ultima uscita di ogni numero."""
+        return self.ultimo - self.ultimo_concorso
+
+    def impronta(self):
+        """Hash del contenuto, usato come chiave dai modelli che dipendono solo dalle statistiche."""
+        h = hashlib.sha1()
+        for array in (self.conteggi, self.coppie, self.ultimo_concorso):
+            h.update(array.tobytes())
+        h.update(str(self.totale).encode())
+        return h.hexdigest()
+
+    def __len__(self):
+        return self.totale
+
+
+def file_statistiche(nome_file):
+    """Percorso dell'istantanea associata al file dei dati."""
+    return nome_file + '.stat.npz'
+
+
+def _leggi(percorso):
+    try:
+        with np.load(percorso) as dati:
+            statistiche = Statistiche()
+            statistiche.conteggi = dati['conteggi']
+            statistiche.coppie = dati['coppie']
+            statistiche.ultimo_concorso = dati['ultimo_concorso']
+            statistiche.totale = int(dati['totale'])
+            return statistiche, dati['firma']
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def salva_statistiche(statistiche, percorso, firma):
+    """Scrive l'istantanea in modo atomico (file temporaneo + rename)."""
+    temporaneo = percorso + '.tmp'
+    try:
+        with open(temporaneo, 'wb') as f:
+            np.savez(
+                f,
+                firma=firma,
+                conteggi=statistiche.conteggi,
+                coppie=statistiche.coppie,
+                ultimo_concorso=statistiche.ultimo_concorso,
+                totale=statistiche.totale,
+            )
+        os.replace(temporaneo, percorso)
+    except OSError as e:
+        print(f"Impossibile salvare le statistiche '{percorso}': {e}")
+
+
+def _da_registro(nome_file, percorso):
+    """
+    Per il registro la firma è (lunghezza coperta, numero di record): si
+    applicano solo i record scritti dopo l'istantanea. Se il registro è stato
+    troncato o riscritto si ricalcola tutto.
+    """
+    reg = registro.Registro(nome_file)
+    statistiche, firma = _leggi(percorso)
+    if statistiche is not None and len(firma) == 2 and firma[0] <= reg.lunghezza:
+        if firma[0] == reg.lunghezza and firma[1] == len(reg):
+            return statistiche
+        righe = reg.righe_da(int(firma[0]))
+        if firma[1] + len(righe) != len(reg):
+            statistiche = None
+        else:
+            nuove = storico.da_righe(righe)
+            statistiche.aggiungi(nuove.maschere, nuove.concorsi)
+    else:
+        statistiche = None
+
+    if statistiche is None:
+        statistiche = Statistiche.da_storico(storico.da_righe(reg.righe_da(0)))
+    salva_statistiche(statistiche, percorso, np.array([reg.lunghezza, len(reg)], dtype=np.int64))
+    return statistiche
+
+
+def carica_statistiche(nome_file=storico.FILE_DATI):
+    """
+    Restituisce le Statistiche del file dei dati, riusando l'istantanea salvata
+    e aggiornandola se il file è cambiato. Va richiamata dopo ogni aggiunta al
+    registro per mantenere l'istantanea allineata.
+    """
+    nome_file = storico.sorgente(nome_file)
+    percorso = file_statistiche(nome_file)
+    if nome_file.endswith('.log'):
+        return _da_registro(nome_file, percorso)
+
+    firma = storico.firma_file(nome_file)
+    statistiche, firma_salvata = _leggi(percorso)
+    if statistiche is not None and np.array_equal(firma_salvata, firma):
+        return statistiche
+
+    statistiche = Statistiche.da_storico(storico.carica_storico(nome_file))
+    salva_statistiche(statistiche, percorso, firma)
+    return statistiche
@@ -0,0 +1,196 @@
+"""
+Storico delle estrazioni Lotofácil codificato a bitset.
+
+Ogni estrazione diventa una maschera a 25 bit (bit n-1 acceso se il numero n
+è stato estratto) in un array NumPy uint32, affiancata dagli array dei numeri
+di concorso e delle date. La versione binaria viene salvata accanto al file di
+testo (dat/dati.txt -> dat/dati.txt.npz) e ricostruita solo quando il testo cambia,
+così gli script non rifanno lo split e la conversione di tutte le righe a ogni
+esecuzione. Frequenze e intersezioni diventano operazioni bit a bit sull'intero
+storico.
+
+Gli scraper aggiornano solo il registro append-only (dat/dati.log, vedi
+registro.py): quando esiste accanto a dati.txt è il registro la sorgente da
+leggere, anche se viene indicato dati.txt.
+"""
+import os
+import datetime
+from collections import namedtuple
+
+import numpy as np
+
+import registro
+
+NUMERI = 25
+NUMERI_PER_ESTRAZIONE = 15
+FILE_TESTO = './dat/dati.txt'
+FILE_DATI = registro.FILE_REGISTRO if os.path.exists(registro.FILE_REGISTRO) else FILE_TESTO
+
+Storico = namedtuple('Storico', ['concorsi', 'date', 'maschere'])
+
+_BIT = np.left_shift(np.uint32(1), np.arange(NUMERI, dtype=np.uint32))
+_POPCOUNT_16 = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+
+def numeri_validi(numeri):
+    """Vero se sono esattamente 15 numeri distinti compresi tra 1 e 25."""
+    return (
+        len(numeri) == NUMERI_PER_ESTRAZIONE
+        and len(set(numeri)) == NUMERI_PER_ESTRAZIONE
+        and all(1 <= n <= NUMERI for n in numeri)
+    )
+
+
+def numeri_a_maschera(numeri):
+    """Converte una sequenza di numeri 1..25 nella maschera a 25 bit."""
+    maschera = 0
+    for numero in numeri:
+        maschera |= 1 << (int(numero) - 1)
+    return maschera
+
+
+def maschera_a_numeri(maschera):
+    """Restituisce la lista ordinata dei numeri accesi nella maschera."""
+    maschera = int(maschera)
+    return [n for n in range(1, NUMERI + 1) if maschera >> (n - 1) & 1]
+
+
+def popcount(maschere):
+    """Conta i bit accesi di ogni elemento di un array di maschere uint32."""
+    maschere = np.asarray(maschere, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(maschere).astype(np.uint8)
+    return _POPCOUNT_16[maschere & 0xFFFF] + _POPCOUNT_16[maschere >> 16]
+
+
+def matrice_bit(maschere):
+    """Espande le maschere in una matrice booleana N x 25 (colonna n-1 = numero n)."""
+    maschere = np.asarray(maschere, dtype=np.uint32)
+    return (maschere[:, None] & _BIT) != 0
+
+
+def matrice_numeri(maschere):
+    """Espande le maschere in una matrice uint8 N x 15 con i numeri in ordine crescente."""
+    bits = matrice_bit(maschere)
+    righe, colonne = np.nonzero(bits)
+    numeri = (colonne + 1).astype(np.uint8)
+    return numeri.reshape(len(bits), -1)
+
+
+def frequenze(maschere):
+    """Restituisce un array di 25 conteggi: quante volte è uscito ogni numero."""
+    return matrice_bit(maschere).sum(axis=0, dtype=np.int64)
+
+
+def intersezioni(maschere, maschera):
+    """Numero di elementi in comune tra la maschera e ogni estrazione dello storico."""
+    return popcount(np.asarray(maschere, dtype=np.uint32) & np.uint32(maschera))
+
+
+def indice_concorsi(storico):
+    """
+    Dizionario concorso -> maschera per la ricerca in O(1) di un concorso.
+    Se un concorso compare più volte vale la prima riga (la più recente in dati.txt).
+    """
+    return dict(zip(storico.concorsi[::-1].tolist(), storico.maschere[::-1].tolist()))
+
+
+def leggi_testo(nome_file):
+    """
+    Legge il file tab-separato (concorso, data, 15 numeri) e restituisce lo Storico.
+    L'ordine delle righe del file viene mantenuto (dati.txt è dal più recente).
+    Un file .log viene letto come registro append-only (vedi registro.py).
+    """
+    if nome_file.endswith('.log'):
+        return da_righe(registro.leggi_righe(nome_file))
+    with open(nome_file, 'r', encoding='utf-8') as file:
+        return da_righe(file)
+
+
+def da_righe(righe):
+    """
+    Costruisce lo Storico da un iterabile di righe nel formato di dati.txt.
+    Le righe senza 15 numeri distinti in 1..25 vengono saltate: ogni maschera
+    ha esattamente 15 bit accesi, come presuppongono matrice_numeri e le cache.
+    """
+    concorsi, date, maschere = [], [], []
+    for linea in righe:
+        dati = linea.split()
+        if len(dati) < 17:
+            continue  # Salta righe malformate
+        try:
+            concorso = int(dati[0])
+            data = datetime.datetime.strptime(dati[1], '%d/%m/%Y').date()
+            numeri = list(map(int, dati[2:17]))
+        except ValueError:
+            print(f"Errore di conversione nei dati: {linea.strip()}")
+            continue
+        if not numeri_validi(numeri):
+            print(f"Numeri non validi (servono 15 numeri distinti da 1 a 25): {linea.strip()}")
+            continue
+        concorsi.append(concorso)
+        date.append(data)
+        maschere.append(numeri_a_maschera(numeri))
+
+    return Storico(
+        np.array(concorsi, dtype=np.int32),
+        np.array(date, dtype='datetime64[D]'),
+        np.array(maschere, dtype=np.uint32),
+    )
+
+
+def sorgente(nome_file):
+    """Il registro .log accanto al file di testo .txt, se esiste, altrimenti il file stesso."""
+    if not nome_file.endswith('.txt'):
+        return nome_file
+    percorso_registro = os.path.splitext(nome_file)[0] + '.log'
+    return percorso_registro if os.path.exists(percorso_registro) else nome_file
+
+
+def firma_file(nome_file):
+    """Dimensione e mtime del file: cambiano a ogni riscrittura del testo."""
+    stat = os.stat(nome_file)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def file_cache(nome_file):
+    """Percorso del file binario associato al file di testo."""
+    return nome_file + '.npz'
+
+
+def carica_storico(nome_file=FILE_DATI):
+    """
+    Carica lo storico dal file binario se è allineato al file di testo,
+    altrimenti rilegge il testo e rigenera il binario.
+    """
+    nome_file = sorgente(nome_file)
+    firma = firma_file(nome_file)
+    percorso_cache = file_cache(nome_file)
+
+    try:
+        with np.load(percorso_cache) as cache:
+            if np.array_equal(cache['firma'], firma):
+                return Storico(cache['concorsi'], cache['date'], cache['maschere'])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    storico = leggi_testo(nome_file)
+    salva_cache(storico, percorso_cache, firma)
+    return storico
+
+
+def salva_cache(storico, percorso_cache, firma):
+    """Scrive il file binario in modo atomico (file temporaneo + rename)."""
+    temporaneo = percorso_cache + '.tmp'
+    try:
+        with open(temporaneo, 'wb') as f:
+            np.savez(
+                f,
+                firma=firma,
+                concorsi=storico.concorsi,
+                date=storico.date,
+                maschere=storico.maschere,
+            )
+        os.replace(temporaneo, percorso_cache)
+    except OSError as e:
+        print(f"Impossibile salvare la cache '{percorso_cache}': {e}")